@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from typing import Any, Iterator
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 
 from .cms_columns import (
     detect_affiliation_facility_id_col,
@@ -26,6 +30,7 @@ from .cms_columns import (
     normalize_codes,
     normalize_states,
 )
+from .frame_cache import read_frame_cache, write_frame_cache
 
 
 @dataclass(frozen=True)
@@ -60,6 +65,21 @@ def get_paths() -> DataPaths:
     return DataPaths(root=_project_root())
 
 
+def puf_data_version() -> tuple[int | None, int | None]:
+    """(physician PUF, referring PUF) mtime_ns, None for a missing file.
+    
+    Part of the key of every cached result derived from the PUFs, so those caches are
+    invalidated together with the column tables when a file is refreshed.
+    """
+    versions = []
+    for path in (get_paths().physician_puf, get_paths().referring_puf):
+        try:
+            versions.append(path.stat().st_mtime_ns)
+        except OSError:
+            versions.append(None)
+    return versions[0], versions[1]
+
+
 @lru_cache(maxsize=4)
 def _phys_puf_header(path: str) -> list[str]:
     return list(pd.read_csv(path, nrows=0, low_memory=False).columns)
@@ -100,6 +120,13 @@ def load_hospital_metadata() -> pd.DataFrame:
     return df
 
 
+@lru_cache(maxsize=2)
+def hospital_metadata_by_id() -> dict[str, dict[str, Any]]:
+    """Hospital metadata rows as dicts keyed by Facility ID (shared; copy before mutating)."""
+    df = load_hospital_metadata()
+    return dict(zip(df["facility_id"].tolist(), df.to_dict(orient="records")))
+
+
 @lru_cache(maxsize=2)
 def load_facility_affiliations() -> pd.DataFrame:
     """Mapping NPI -> Facility ID (hospital certification number)."""
@@ -119,6 +146,156 @@ def load_facility_affiliations() -> pd.DataFrame:
     return df
 
 
+@lru_cache(maxsize=2)
+def load_affiliated_hospitals_by_npi() -> dict[str, tuple[tuple[str, str, str, str], ...]]:
+    """NPI -> (facility_id, hospital_name, hospital_city, hospital_state) per affiliated hospital.
+
+    Affiliations are joined with hospital metadata once, so facilities without metadata are
+    already dropped and callers need a single dict lookup per NPI (affiliation file order kept).
+    """
+    joined = load_facility_affiliations().merge(load_hospital_metadata(), on="facility_id", how="inner")
+    for col in ["hospital_name", "hospital_city", "hospital_state"]:
+        if col not in joined.columns:
+            joined[col] = ""
+
+    by_npi: dict[str, list[tuple[str, str, str, str]]] = {}
+    for npi, fac_id, name, city, state in zip(
+        joined["npi"],
+        joined["facility_id"].astype(str),
+        joined["hospital_name"].astype(str),
+        joined["hospital_city"].astype(str),
+        joined["hospital_state"].astype(str),
+    ):
+        by_npi.setdefault(npi, []).append((fac_id, name, city, state))
+    return {npi: tuple(hospitals) for npi, hospitals in by_npi.items()}
+
+
+# Columns always present in load_physician_columns(); payment columns are kept only when the PUF has them
+_PHYSICIAN_COLUMNS = ["npi", "code", "state", "services"]
+_PHYSICIAN_CATEGORY_COLUMNS = ["npi", "code", "state"]
+
+
+def _category_labels(col: pd.Series) -> np.ndarray:
+    """Stripped, uppercased categories of a categorical column, indexable by its codes.
+    
+    A trailing "NAN" slot (what str(nan).upper() gives) is what code -1 (missing) indexes.
+    """
+    labels = col.cat.categories.astype(str).str.strip().str.upper().to_numpy(dtype=object)
+    return np.append(labels, "NAN")
+
+
+def _upper_labels(col: pd.Series) -> np.ndarray:
+    """Per-row stripped, uppercased string values of a categorical column (string work once per category)."""
+    return _category_labels(col)[col.cat.codes.to_numpy()]
+
+
+def _read_csv_prefetched(path: Path, **kwargs) -> Iterator[pd.DataFrame]:
+    """Chunks of pd.read_csv(path, chunksize=..., **kwargs), each parsed on a worker thread.
+    
+    The next chunk is parsed while the caller works on the current one; pandas' C parser
+    releases the GIL, so the two overlap.
+    """
+    with pd.read_csv(path, **kwargs) as reader, ThreadPoolExecutor(max_workers=1) as ex:
+        pending = ex.submit(next, reader, None)
+        while True:
+            chunk = pending.result()
+            if chunk is None:
+                return
+            pending = ex.submit(next, reader, None)
+            yield chunk
+
+
+def _narrow_float(col: pd.Series) -> pd.Series:
+    """A float64 column as float32 when every value round-trips exactly (e.g. service counts)."""
+    if col.dtype == np.float64:
+        narrow = col.astype(np.float32)
+        if np.array_equal(narrow.to_numpy(dtype=np.float64), col.to_numpy(), equal_nan=True):
+            return narrow
+    return col
+
+
+def physician_numeric(col: pd.Series) -> pd.Series:
+    """Numeric values of a load_physician_columns() column, invalid or missing as 0.
+    
+    Columns stored as float32 are widened back to float64, so sums accumulate at full precision.
+    """
+    values = pd.to_numeric(col, errors="coerce").fillna(0)
+    if values.dtype == np.float32:
+        values = values.astype(np.float64)
+    return values
+
+
+def _read_physician_columns(path: Path) -> pd.DataFrame:
+    """Read the npi/code/state/services/payment columns of the physician PUF.
+    
+    NPIs are stripped strings and codes/states stripped, uppercased strings, all kept as
+    categoricals; services and payments are left as parsed, except that float columns whose
+    values fit float32 exactly are stored as float32 (read them with physician_numeric()).
+    """
+    header = _phys_puf_header(str(path))
+    
+    npi_col = detect_npi_col(header)
+    hcpcs_col = detect_hcpcs_col(header)
+    state_col = detect_state_col(header)
+    services_col = detect_services_col(header)
+    total_payment_col = detect_total_payment_col(header)
+    avg_payment_col = detect_avg_payment_col(header)
+    
+    usecols = list(dict.fromkeys(c for c in [npi_col, hcpcs_col, state_col, services_col, total_payment_col, avg_payment_col] if c))
+    sources = {"services": services_col, "total_payment": total_payment_col, "avg_payment": avg_payment_col}
+    columns = _PHYSICIAN_COLUMNS + [name for name, col in sources.items() if col and name != "services"]
+    
+    parts: list[pd.DataFrame] = []
+    # Codes and states repeat heavily, so read them as categoricals and normalize per category;
+    # NPIs are kept as the file's text rather than parsed to integers and formatted back
+    dtypes = {c: "category" for c in [hcpcs_col, state_col] if c}
+    dtypes[npi_col] = str
+    for chunk in _read_csv_prefetched(path, usecols=usecols, dtype=dtypes, low_memory=False, chunksize=250_000):
+        part = pd.DataFrame({
+            "npi": chunk[npi_col].astype(str).str.strip().astype("category"),
+            "code": pd.Categorical(_upper_labels(chunk[hcpcs_col])),
+            "state": pd.Categorical(_upper_labels(chunk[state_col])),
+            **{name: chunk[col] for name, col in sources.items() if col},
+        })
+        parts.append(part[columns])
+    
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    
+    numeric = [c for c in columns if c not in _PHYSICIAN_CATEGORY_COLUMNS]
+    table = pd.concat([p[numeric] for p in parts], ignore_index=True)
+    for col in numeric:
+        table[col] = _narrow_float(table[col])
+    # Plain concat would fall back to object dtype when chunk categories differ
+    for col in _PHYSICIAN_CATEGORY_COLUMNS:
+        table[col] = union_categoricals([p[col].array for p in parts])
+    return table[columns]
+
+
+def load_physician_columns() -> pd.DataFrame:
+    """Physician PUF rows reduced to npi, code, state, services and any payment columns.
+    
+    Parsed once and cached per file version (path, mtime_ns), in process and as a pickle next
+    to the CSV that is rebuilt whenever the CSV is newer (failing to write the cache is not an
+    error). The table is shared, so do not mutate it. Row order matches the file, and string
+    columns are categoricals, so filter with isin() and convert only the matching rows.
+    """
+    path = get_paths().physician_puf
+    return _load_physician_columns(str(path), path.stat().st_mtime_ns)
+
+
+@lru_cache(maxsize=2)
+def _load_physician_columns(path: str, mtime_ns: int) -> pd.DataFrame:
+    cache_file = Path(path).with_suffix(".columns.pkl")
+    table = read_frame_cache(cache_file, mtime_ns)
+    if table is not None and list(table.columns[:len(_PHYSICIAN_COLUMNS)]) == _PHYSICIAN_COLUMNS:
+        return table
+    
+    table = _read_physician_columns(Path(path))
+    write_frame_cache(table, cache_file)
+    return table
+
+
 def attach_hospital_affiliations(df_doctors: pd.DataFrame) -> pd.DataFrame:
     """
     Input: df with an 'npi' column.
@@ -207,7 +384,26 @@ def doctors_by_codes(
     Search for doctors by codes. Routes to appropriate dataset:
     - HCPCS codes (letter-prefixed) -> refHCPCS.csv
     - CPT codes (numeric) -> physHCPCS.csv
+    
+    Results are memoized per normalized argument set and PUF file version, as in
+    hospitals_by_codes; callers get their own copy.
     """
+    codes_key = tuple(normalize_codes(codes))
+    states_key = tuple(normalize_states(states)) or None
+    return _doctors_by_codes_cached(codes_key, states_key, min_services, max_rows, puf_data_version()).copy()
+
+
+@lru_cache(maxsize=64)
+def _doctors_by_codes_cached(
+    codes_key: tuple[str, ...],
+    states_key: tuple[str, ...] | None,
+    min_services: int | None,
+    max_rows: int,
+    data_version: tuple[int | None, int | None],
+) -> pd.DataFrame:
+    """Doctor search per normalized codes/states and PUF data version; the returned frame is shared (do not mutate)."""
+    codes = list(codes_key)
+    states = list(states_key) if states_key is not None else None
     from .code_type_detection import split_codes_by_type
     
     # Split codes by type
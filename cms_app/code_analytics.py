@@ -66,19 +66,21 @@ def get_top_codes_by_volume(
         # Filter by states if provided (would need state column - skip for now for performance)
         # For now, aggregate all codes
         
-        for _, row in chunk.iterrows():
-            code = str(row["code"])
+        # Columns are already normalized above; tolist() yields native str/float values in one C pass
+        for code, services, payment in zip(
+            chunk["code"].tolist(),
+            chunk["services"].astype(float).tolist(),
+            chunk["total_payment"].astype(float).tolist(),
+        ):
             if not code or code == "NAN":
                 continue
             
-            services = float(row["services"])
-            payment = float(row.get("total_payment", 0))
+            totals = code_totals.get(code)
+            if totals is None:
+                totals = code_totals[code] = {"services": 0.0, "payments": 0.0}
             
-            if code not in code_totals:
-                code_totals[code] = {"services": 0.0, "payments": 0.0}
-            
-            code_totals[code]["services"] += services
-            code_totals[code]["payments"] += payment
+            totals["services"] += services
+            totals["payments"] += payment
     
     # Convert to DataFrame
     rows = []
@@ -6,6 +6,8 @@ into device categories, making it easier to find target customer lists.
 from __future__ import annotations
 
 import json
+import os
+import threading
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -81,11 +83,25 @@ class CodeClassificationManager:
         
         self.file_path = Path(file_path)
         self._categories: dict[str, DeviceCategory] = {}
+        # Modification time of the file as last loaded or saved by this manager
+        self.mtime_ns: int | None = None
+        # Held for every mutate-and-save (and by get_classification_manager before replacing
+        # this instance), so concurrent requests sharing the manager neither see the dict change
+        # mid-iteration nor lose a change to a reload
+        self._lock = threading.RLock()
         self._load()
     
+    def file_mtime_ns(self) -> int | None:
+        """Current modification time of the JSON file (None if it does not exist)."""
+        try:
+            return self.file_path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
     def _load(self) -> None:
         """Load classifications from JSON file."""
-        if not self.file_path.exists():
+        self.mtime_ns = self.file_mtime_ns()
+        if self.mtime_ns is None:
             self._categories = {}
             return
         
@@ -102,17 +118,27 @@ class CodeClassificationManager:
             self._categories = {}
     
     def _save(self) -> None:
-        """Save classifications to JSON file."""
-        # Ensure directory exists
-        self.file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        data = {
-            name: cat.to_dict()
-            for name, cat in self._categories.items()
-        }
+        """Save classifications to JSON file.
         
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        Runs under self._lock (re-entered from the mutators), so the file replace and the
+        mtime_ns update are one step to get_classification_manager.
+        """
+        with self._lock:
+            # Ensure directory exists
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            data = {
+                name: cat.to_dict()
+                for name, cat in self._categories.items()
+            }
+            
+            # Written to a sibling temp file and renamed into place, so a concurrent reload
+            # never reads a partly written file
+            tmp_path = self.file_path.with_name(f"{self.file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.file_path)
+            self.mtime_ns = self.file_mtime_ns()
     
     def get_category(self, name: str) -> DeviceCategory | None:
         """Get a category by name.
@@ -131,7 +157,8 @@ class CodeClassificationManager:
         Returns:
             List of all DeviceCategory objects, sorted by name
         """
-        return sorted(self._categories.values(), key=lambda c: c.name.lower())
+        with self._lock:
+            return sorted(self._categories.values(), key=lambda c: c.name.lower())
     
     def add_category(self, name: str, description: str = "") -> DeviceCategory:
         """Create a new category.
@@ -146,13 +173,14 @@ class CodeClassificationManager:
         Raises:
             ValueError: If category with this name already exists
         """
-        if name in self._categories:
-            raise ValueError(f"Category '{name}' already exists")
-        
-        category = DeviceCategory(name=name, description=description)
-        self._categories[name] = category
-        self._save()
-        return category
+        with self._lock:
+            if name in self._categories:
+                raise ValueError(f"Category '{name}' already exists")
+            
+            category = DeviceCategory(name=name, description=description)
+            self._categories[name] = category
+            self._save()
+            return category
     
     def update_category(self, name: str, description: str | None = None) -> DeviceCategory:
         """Update an existing category.
@@ -167,16 +195,17 @@ class CodeClassificationManager:
         Raises:
             KeyError: If category not found
         """
-        if name not in self._categories:
-            raise KeyError(f"Category '{name}' not found")
-        
-        category = self._categories[name]
-        if description is not None:
-            category.description = description
-            category.updated_at = datetime.now().isoformat()
-        
-        self._save()
-        return category
+        with self._lock:
+            if name not in self._categories:
+                raise KeyError(f"Category '{name}' not found")
+            
+            category = self._categories[name]
+            if description is not None:
+                category.description = description
+                category.updated_at = datetime.now().isoformat()
+            
+            self._save()
+            return category
     
     def delete_category(self, name: str) -> bool:
         """Delete a category.
@@ -187,11 +216,12 @@ class CodeClassificationManager:
         Returns:
             True if deleted, False if not found
         """
-        if name in self._categories:
-            del self._categories[name]
-            self._save()
-            return True
-        return False
+        with self._lock:
+            if name in self._categories:
+                del self._categories[name]
+                self._save()
+                return True
+            return False
     
     def add_code_to_category(self, category_name: str, code: str) -> bool:
         """Add a code to a category.
@@ -203,14 +233,15 @@ class CodeClassificationManager:
         Returns:
             True if code was added, False if already present or category not found
         """
-        category = self.get_category(category_name)
-        if not category:
-            return False
-        
-        added = category.add_code(code)
-        if added:
-            self._save()
-        return added
+        with self._lock:
+            category = self.get_category(category_name)
+            if not category:
+                return False
+            
+            added = category.add_code(code)
+            if added:
+                self._save()
+            return added
     
     def remove_code_from_category(self, category_name: str, code: str) -> bool:
         """Remove a code from a category.
@@ -222,14 +253,15 @@ class CodeClassificationManager:
         Returns:
             True if code was removed, False if not found or category not found
         """
-        category = self.get_category(category_name)
-        if not category:
-            return False
-        
-        removed = category.remove_code(code)
-        if removed:
-            self._save()
-        return removed
+        with self._lock:
+            category = self.get_category(category_name)
+            if not category:
+                return False
+            
+            removed = category.remove_code(code)
+            if removed:
+                self._save()
+            return removed
     
     def get_codes_for_category(self, category_name: str) -> list[str]:
         """Get all codes for a category.
@@ -268,3 +300,30 @@ class CodeClassificationManager:
         return name in self._categories
 
 
+# Global instance (lazy-loaded, reloaded when the classifications file changes on disk)
+_manager: CodeClassificationManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_classification_manager() -> CodeClassificationManager:
+    """Get the global classification manager for the default classifications file.
+    
+    The JSON file is re-read only when it changed since the manager last loaded or saved
+    it (e.g. a save by another process), instead of on every call. A reload builds a new
+    manager under a lock and then swaps the reference, so callers never see a partly loaded one.
+    Mutations lock the manager itself; see CodeClassificationManager._lock.
+    """
+    global _manager
+    manager = _manager
+    if manager is not None and manager.file_mtime_ns() == manager.mtime_ns:
+        return manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = CodeClassificationManager(Config.CODE_CLASSIFICATIONS_FILE)
+            return _manager
+        # Wait out any mutate-and-save on the current instance; its own save updates mtime_ns
+        # under the same lock, so only changes made elsewhere trigger the reload
+        with _manager._lock:
+            if _manager.file_mtime_ns() != _manager.mtime_ns:
+                _manager = CodeClassificationManager(Config.CODE_CLASSIFICATIONS_FILE)
+        return _manager
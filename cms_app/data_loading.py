@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 from typing import Iterable
 
+import numpy as np
 import pandas as pd
 
 
@@ -90,14 +94,52 @@ def _find_col_contains(columns: Iterable[str], *needles: str) -> str | None:
     return None
 
 
+def _concat_parts(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate filtered chunks; a single surviving chunk is reused as-is instead of copied."""
+    if len(parts) == 1:
+        return parts[0].set_axis(pd.RangeIndex(len(parts[0])), axis=0, copy=False)
+    return pd.concat(parts, ignore_index=True, copy=False)
+
+
+def _sorted_npi_keys(npis: pd.Series) -> np.ndarray | None:
+    """Sorted unique int64 NPIs, or None if any NPI isn't a plain digit string."""
+    s = npis.astype(str)
+    if not s.str.fullmatch(r"[0-9]{1,18}").all():
+        return None
+    return np.unique(s.to_numpy().astype(np.int64))
+
+
+def _in_sorted(keys: np.ndarray, haystack: np.ndarray) -> np.ndarray:
+    """Vectorized membership test of int keys against a sorted int array (binary search)."""
+    if haystack.size == 0:
+        return np.zeros(keys.size, dtype=bool)
+    idx = np.searchsorted(haystack, keys)
+    np.minimum(idx, haystack.size - 1, out=idx)
+    return haystack[idx] == keys
+
+
+@lru_cache(maxsize=32)
+def _cached_columns(path: str, mtime_ns: int) -> tuple[str, ...]:
+    # Header only: no need to boot the pandas tokenizer. utf-8-sig drops a BOM like pandas does.
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return tuple(next(csv.reader(f), []))
+
+
 def _read_columns(path: Path) -> list[str]:
-    return list(pd.read_csv(path, nrows=0).columns)
+    return list(_cached_columns(str(path), os.stat(path).st_mtime_ns))
 
 
 def load_doctors(util_path: Path, nat_path: Path) -> pd.DataFrame:
-    """Load and normalize Doctors master dataframe (utilization + national, joined on NPI)."""
-    util_cols = _read_columns(util_path)
-    nat_cols = _read_columns(nat_path)
+    """Load and normalize Doctors master dataframe (utilization + national, joined on NPI).
+
+    The two files are independent, so their headers and bodies are read concurrently;
+    pandas' C parser releases the GIL, so wall-clock is roughly the slower of the two reads.
+    """
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        util_cols_fut = ex.submit(_read_columns, util_path)
+        nat_cols_fut = ex.submit(_read_columns, nat_path)
+        util_cols = util_cols_fut.result()
+        nat_cols = nat_cols_fut.result()
 
     util_npi = _first_existing(util_cols, "NPI") or _find_col_contains(util_cols, "npi")
     util_proc = _first_existing(util_cols, "Procedure_Category") or _find_col_contains(util_cols, "procedure_category")
@@ -134,8 +176,11 @@ def load_doctors(util_path: Path, nat_path: Path) -> pd.DataFrame:
     util_usecols = [c for c in [util_npi, util_proc, util_count, util_percentile] if c]
     nat_usecols = [c for c in [nat_npi, nat_first, nat_last, nat_city, nat_state, nat_zip, nat_spec] if c]
 
-    util = pd.read_csv(util_path, usecols=util_usecols, low_memory=False)
-    nat = pd.read_csv(nat_path, usecols=nat_usecols, low_memory=False)
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        util_fut = ex.submit(pd.read_csv, util_path, usecols=util_usecols, low_memory=False)
+        nat_fut = ex.submit(pd.read_csv, nat_path, usecols=nat_usecols, low_memory=False)
+        util = util_fut.result()
+        nat = nat_fut.result()
 
     # Normalize columns
     util = util.rename(columns={
@@ -241,29 +286,42 @@ def load_national_min(
         if st is not None:
             chunk = chunk[chunk["state"].isin(st)]
         if not chunk.empty:
-            parts.append(chunk)
+            # Dedupe within the chunk so less data is carried into the final concat
+            parts.append(chunk.drop_duplicates(subset=["npi"], keep="first"))
 
     if not parts:
         return pd.DataFrame(
             columns=["npi", "first_name", "last_name", "primary_specialty", "city", "state", "zip"]
         )
 
-    nat = pd.concat(parts, ignore_index=True)
+    nat = _concat_parts(parts)
     nat["npi"] = nat["npi"].astype(str)
     nat["state"] = nat["state"].astype("category")
     nat = nat.drop_duplicates(subset=["npi"], keep="first")
     return nat
 
 
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """Mark numpy-backed blocks read-only so a cached frame can be shared without copying."""
+    for blk in df._mgr.blocks:
+        if isinstance(blk.values, np.ndarray):
+            blk.values.flags.writeable = False
+    return df
+
+
 @lru_cache(maxsize=16)
 def _cached_national_min(nat_path: str, states_key: tuple[str, ...]) -> pd.DataFrame:
     states = list(states_key) if states_key else None
-    return load_national_min(Path(nat_path), states=states)
+    return _freeze(load_national_min(Path(nat_path), states=states))
 
 
 def get_national_min(nat_path: Path, states: list[str] | None = None) -> pd.DataFrame:
+    """Cached minimal national dataframe.
+
+    The returned frame is shared and read-only; call `.copy()` before mutating it.
+    """
     key = tuple(sorted({str(s).strip().upper() for s in (states or []) if str(s).strip()}))
-    return _cached_national_min(str(nat_path), key).copy()
+    return _cached_national_min(str(nat_path), key)
 
 
 def load_hospitals(general_info_path: Path) -> pd.DataFrame:
@@ -336,9 +394,9 @@ def query_doctors(
         raise KeyError(f"Utilization.csv missing required columns: {missing}")
 
     national = get_national_min(nat_path, states=states)
+    # Selected NPIs as sorted int64 keys; the string set is only built if a chunk needs it
     npi_set: set[str] | None = None
-    if states:
-        npi_set = set(national["npi"].astype(str))
+    npi_keys = _sorted_npi_keys(national["npi"]) if states else None
 
     subs = [s.strip() for s in (procedure_substrings or []) if str(s).strip()]
     subs_lower = [s.lower() for s in subs]
@@ -356,9 +414,15 @@ def query_doctors(
         if "" in chunk.columns:
             chunk = chunk.drop(columns=[""])
 
+        if states:
+            if npi_keys is not None and pd.api.types.is_integer_dtype(chunk["npi"].dtype):
+                # NPIs parsed as integers: binary search instead of hashing Python strings
+                chunk = chunk[_in_sorted(chunk["npi"].to_numpy(dtype=np.int64), npi_keys)]
+            else:
+                if npi_set is None:
+                    npi_set = set(national["npi"].astype(str))
+                chunk = chunk[chunk["npi"].astype(str).isin(npi_set)]
         chunk["npi"] = chunk["npi"].astype(str)
-        if npi_set is not None:
-            chunk = chunk[chunk["npi"].isin(npi_set)]
 
         if subs_lower:
             cats = chunk["procedure_category"].astype(str)
@@ -386,7 +450,7 @@ def query_doctors(
         ]
         return pd.DataFrame(columns=cols)
 
-    util = pd.concat(parts, ignore_index=True)
+    util = _concat_parts(parts)
     util["count"] = pd.to_numeric(util["count"], errors="coerce")
     if "percentile" in util.columns:
         util["percentile"] = pd.to_numeric(util["percentile"], errors="coerce")
@@ -453,3 +517,17 @@ def get_doctors_df(files: DoctorsFiles) -> pd.DataFrame:
 
 def get_hospitals_df(files: HospitalFiles) -> pd.DataFrame:
     return _cached_hospitals(str(files.general_info)).copy()
+
+
+@lru_cache(maxsize=32)
+def _cached_hospitals_filtered(general_info_path: str, states_key: tuple[str, ...]) -> pd.DataFrame:
+    from .filters import filter_hospitals
+
+    states = list(states_key) if states_key else None
+    return filter_hospitals(_cached_hospitals(general_info_path), states=states)
+
+
+def get_hospitals_filtered(files: HospitalFiles, states: list[str] | None = None) -> pd.DataFrame:
+    """filter_hospitals over the cached hospitals frame, without copying the full frame first."""
+    st_key = tuple(sorted({str(s).strip().upper() for s in (states or []) if str(s).strip()}))
+    return _cached_hospitals_filtered(str(files.general_info), st_key).copy()
@@ -1,6 +1,10 @@
 """Data validation and health checks for CMS data files."""
 from __future__ import annotations
 
+import os
+import stat
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -8,56 +12,53 @@ from .config import Config
 from .logger import logger
 
 
+# File-system status rarely changes while the app is running, but the index view
+# asks for it twice per request; re-probe at most this often.
+_STATUS_TTL_SECONDS = 30
+
+
+def _probe(path: Path, want_dir: bool = False) -> tuple[bool, bool]:
+    """Return (exists, readable) for a path using a single stat call."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False, False
+    readable = stat.S_ISDIR(st.st_mode) if want_dir else stat.S_ISREG(st.st_mode)
+    return True, readable
+
+
+def _status_entry(path: Path, want_dir: bool = False) -> Dict[str, any]:
+    exists, readable = _probe(path, want_dir=want_dir)
+    return {"exists": exists, "path": str(path), "readable": readable}
+
+
+@lru_cache(maxsize=1)
+def _cached_data_files(_ttl_bucket: int) -> Dict[str, Dict[str, any]]:
+    return {
+        # Physician PUF file
+        "physician_puf": _status_entry(Config.PROJECT_ROOT / "physHCPCS.csv"),
+        # Hospital directory
+        "hospitals": _status_entry(Config.HOSPITALS_DIR, want_dir=True),
+        # HCPCS data
+        "hcpcs": _status_entry(Config.HCPCS_DATA_DIR / "HCPC2026_JAN_ANWEB_12082025.txt"),
+        # Referring provider PUF (for HCPCS A-codes)
+        "referring_puf": _status_entry(Config.REFERRING_PUF),
+        # Facility affiliations
+        "facility_affiliations": _status_entry(Config.DOCTORS_DIR / "Facility_Affiliation.csv"),
+    }
+
+
 def check_data_files() -> Dict[str, Dict[str, any]]:
     """
     Check if required data files exist and are accessible.
     
+    Results are cached for a short TTL so repeated health checks don't re-stat every file.
+    
     Returns:
         Dictionary with status for each data source
     """
-    status = {}
-    
-    # Check physician PUF file
-    phys_path = Config.PROJECT_ROOT / "physHCPCS.csv"
-    status["physician_puf"] = {
-        "exists": phys_path.exists(),
-        "path": str(phys_path),
-        "readable": phys_path.exists() and phys_path.is_file(),
-    }
-    
-    # Check hospital directory
-    hosp_dir = Config.HOSPITALS_DIR
-    status["hospitals"] = {
-        "exists": hosp_dir.exists(),
-        "path": str(hosp_dir),
-        "readable": hosp_dir.exists() and hosp_dir.is_dir(),
-    }
-    
-    # Check HCPCS data
-    hcpcs_file = Config.HCPCS_DATA_DIR / "HCPC2026_JAN_ANWEB_12082025.txt"
-    status["hcpcs"] = {
-        "exists": hcpcs_file.exists(),
-        "path": str(hcpcs_file),
-        "readable": hcpcs_file.exists() and hcpcs_file.is_file(),
-    }
-    
-    # Check referring provider PUF (for HCPCS A-codes)
-    ref_path = Config.REFERRING_PUF
-    status["referring_puf"] = {
-        "exists": ref_path.exists(),
-        "path": str(ref_path),
-        "readable": ref_path.exists() and ref_path.is_file(),
-    }
-    
-    # Check facility affiliations
-    fac_aff_path = Config.DOCTORS_DIR / "Facility_Affiliation.csv"
-    status["facility_affiliations"] = {
-        "exists": fac_aff_path.exists(),
-        "path": str(fac_aff_path),
-        "readable": fac_aff_path.exists() and fac_aff_path.is_file(),
-    }
-    
-    return status
+    status = _cached_data_files(int(time.monotonic() // _STATUS_TTL_SECONDS))
+    return {name: dict(info) for name, info in status.items()}
 
 
 def get_data_health_summary() -> str:
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from typing import Iterable
+from typing import Callable, Iterable
 
+import numpy as np
 import pandas as pd
 
 
@@ -47,6 +48,20 @@ def _normalize_substrings(values: list[str] | None) -> list[str]:
     return out
 
 
+def _column_mask(col: pd.Series, predicate: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+    """Evaluate a string predicate and return a row-level boolean ndarray.
+
+    For categorical columns the predicate runs once per category (plus one slot for
+    missing values, which stringify to "nan") and is broadcast back via the codes.
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        labels = pd.Series(list(col.cat.categories.astype(str)) + ["nan"])
+        cat_mask = predicate(labels).to_numpy(dtype=bool)
+        # code -1 (missing) indexes the trailing "nan" slot
+        return cat_mask[col.cat.codes.to_numpy()]
+    return predicate(col.astype(str)).to_numpy(dtype=bool)
+
+
 def filter_doctors(
     df: pd.DataFrame,
     states: list[str] | None = None,
@@ -59,21 +74,27 @@ def filter_doctors(
     - Returns a dataframe sorted by count (desc), then last_name, first_name.
     """
     out = df
+    mask: np.ndarray | None = None
 
     st = _normalize_states(states)
     if st:
         if "state" not in out.columns:
             raise KeyError("Expected column 'state' in doctors dataframe")
-        out = out[out["state"].astype(str).str.upper().isin(st)]
+        mask = _column_mask(out["state"], lambda s: s.str.upper().isin(st))
 
     subs = _normalize_substrings(procedure_substrings)
     if subs:
         if "procedure_category" not in out.columns:
             raise KeyError("Expected column 'procedure_category' in doctors dataframe")
-        cat = out["procedure_category"].astype(str)
-        mask = pd.Series(False, index=out.index)
-        for sub in subs:
-            mask = mask | cat.str.contains(sub, case=False, na=False)
+        # One alternation instead of OR-ing a mask per substring
+        pattern = "|".join(f"(?:{sub})" for sub in subs)
+        sub_mask = _column_mask(
+            out["procedure_category"],
+            lambda s: s.str.contains(pattern, case=False, na=False),
+        )
+        mask = sub_mask if mask is None else (mask & sub_mask)
+
+    if mask is not None:
         out = out[mask]
 
     sort_cols: list[str] = []
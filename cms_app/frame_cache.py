@@ -0,0 +1,41 @@
+"""On-disk DataFrame caches (pickles) kept next to the source files they are parsed from."""
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+
+def read_frame_cache(cache_file: Path, source_mtime_ns: int) -> pd.DataFrame | None:
+    """The DataFrame pickled at cache_file, or None if it is missing, older than its source or unreadable."""
+    try:
+        if cache_file.stat().st_mtime_ns < source_mtime_ns:
+            return None
+        table = pd.read_pickle(cache_file)
+    except Exception:
+        # A truncated or foreign pickle can fail in many ways (EOFError, AttributeError, ...); rebuild
+        return None
+    return table if isinstance(table, pd.DataFrame) else None
+
+
+def write_frame_cache(table: pd.DataFrame, cache_file: Path) -> None:
+    """Pickle table to cache_file atomically; failing to write it is not an error.
+    
+    The pickle goes to a temporary file in the same directory that is then renamed over
+    cache_file, so readers never see a partly written cache (even with concurrent writers).
+    """
+    try:
+        fd, tmp = tempfile.mkstemp(dir=cache_file.parent, prefix=f"{cache_file.name}.", suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            table.to_pickle(f)
+        os.replace(tmp, cache_file)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
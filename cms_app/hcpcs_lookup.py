@@ -4,18 +4,79 @@ Provides code descriptions, metadata, and search functionality using HCPCS 2026
 """
 from __future__ import annotations
 
+import bisect
 import re
+import sys
+from collections import defaultdict
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
 
 from .config import Config
+from .frame_cache import read_frame_cache, write_frame_cache
+from .logger import logger
+
+
+# Fixed-width layout (0-indexed, end-exclusive) per HCPC2026_recordlayout.txt, whose
+# 1-indexed positions are: code 1-5, sequence 6-10, record ID 11 (3=procedure first line,
+# 4=procedure continuation, 7=modifier first, 8=modifier continuation), long description
+# 12-91, short description 92-119, pricing indicator 120-121, coverage code 230, BETOS code
+# 257-259, type of service 261, code added date 269-276, action effective date 277-284,
+# termination date 285-292, action code 293.
+_FWF_COLSPECS = [
+    (0, 5), (5, 10), (10, 11), (11, 91), (91, 119), (119, 121), (229, 230),
+    (256, 259), (260, 261), (268, 276), (276, 284), (284, 292), (292, 293),
+]
+_FWF_NAMES = [
+    "code", "sequence", "record_id", "long_description", "short_description",
+    "pricing_indicator", "coverage_code", "betos_code", "type_of_service",
+    "code_added_date", "effective_date", "termination_date", "action_code",
+]
+# ASCII unit separator between fields in the search haystack, so matches cannot span fields
+_SEARCH_SEP = "\x1f"
+# Bytes per record up to and including the Action Code (position 293)
+_RECORD_WIDTH = 293
+# Fields where a code's first non-empty value across its records wins
+_FIRST_VALUE_FIELDS = [
+    "short_description", "pricing_indicator", "coverage_code", "betos_code",
+    "type_of_service", "effective_date", "termination_date", "action_code",
+]
+# Parsed (and cached) table layout: one row per code, lowercased search text last
+_TABLE_COLUMNS = ["code", "long_description", *_FIRST_VALUE_FIELDS, "search_text"]
+_LONG_INDEX = _FWF_NAMES.index("long_description")
+_FIRST_VALUE_INDEXES = [_FWF_NAMES.index(name) for name in _FIRST_VALUE_FIELDS]
+
+
+def _record_sort_key(record: list[str]) -> tuple[str, int]:
+    """Order a code's records by record_id, then numeric sequence (unparseable sorts as 0)."""
+    try:
+        seq_num = int(record[1]) if record[1] else 0
+    except ValueError:
+        seq_num = 0
+    return (record[2], seq_num)
 
 
-@dataclass
+def _intern(value: str | None) -> str | None:
+    """Intern low-cardinality field values so repeated ones share a single string object."""
+    return sys.intern(value) if value else value
+
+
+@dataclass(frozen=True)
 class HCPCSCode:
-    """Represents a single HCPCS code with all its metadata."""
+    """Represents a single HCPCS code with all its metadata.
+    
+    Instances are immutable and slotted (no per-instance __dict__) since thousands are kept in memory.
+    """
+    __slots__ = (
+        "code", "modifier", "long_description", "short_description", "pricing_indicator",
+        "coverage_code", "betos_code", "type_of_service", "effective_date", "termination_date",
+        "action_code",
+    )
+    
     code: str
     modifier: str | None
     long_description: str
@@ -60,64 +121,79 @@ class HCPCSLookup:
         
         self.hcpcs_file = Path(hcpcs_file)
         self._codes: dict[str, HCPCSCode] = {}
+        self._by_betos: dict[str | None, tuple[str, ...]] = {}
+        self._sorted_codes: list[str] = []
+        self._code_list: list[HCPCSCode] = []
+        self._search_haystack = pd.Series([], dtype=object)
         self._load_codes()
+        self._build_indexes()
     
-    def _parse_fixed_width_line(self, line: str) -> dict[str, Any] | None:
-        """Parse a fixed-width HCPCS record line.
+    def _read_procedure_records(self) -> dict[str, list[list[str]]]:
+        """Read the trimmed fixed-width fields of every procedure record (record_id 3 or 4).
         
-        Based on HCPC2026_recordlayout.txt (1-indexed positions):
-        - Positions 1-5: HCPCS Code
-        - Positions 6-10: Sequence Number
-        - Position 11: Record ID (3=procedure first line, 4=procedure continuation, 7=modifier first, 8=modifier continuation)
-        - Positions 12-91: Long Description (80 chars)
-        - Positions 92-119: Short Description (28 chars)
-        - Positions 120-121: Pricing Indicator (first)
-        - Position 230: Coverage Code
-        - Positions 257-259: BETOS Code
-        - Position 261: Type of Service
-        - Positions 269-276: Code Added Date
-        - Positions 277-284: Action Effective Date
-        - Positions 285-292: Termination Date
-        - Position 293: Action Code
+        Returns each code's records (fields in _FWF_NAMES order), with codes in order of
+        first appearance in the file.
         """
-        if len(line) < 293:
-            return None
+        records: dict[str, list[list[str]]] = defaultdict(list)
+        skipped = 0
+        with open(self.hcpcs_file, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                # Only process procedure records (record_id 3 or 4);
+                # modifiers (7, 8) are handled separately if needed
+                if line[10:11] not in ("3", "4"):
+                    continue
+                # Procedure records cut short of the Action Code (position 293) are malformed
+                if len(line) < _RECORD_WIDTH:
+                    skipped += 1
+                    continue
+                fields = [line[begin:end].strip() for begin, end in _FWF_COLSPECS]
+                if fields[0]:
+                    records[fields[0]].append(fields)
         
-        # Convert to 0-indexed
-        code = line[0:5].strip()  # positions 1-5
-        sequence = line[5:10].strip() if len(line) > 10 else ""  # positions 6-10
-        record_id = line[10:11] if len(line) > 10 else ""  # position 11
-        long_desc = line[11:91].strip() if len(line) > 91 else ""  # positions 12-91
-        short_desc = line[91:119].strip() if len(line) > 119 else ""  # positions 92-119
-        pricing_ind = line[119:121].strip() if len(line) > 121 else None  # positions 120-121
-        coverage = line[229:230].strip() if len(line) > 230 else None  # position 230
-        betos = line[256:259].strip() if len(line) > 259 else None  # positions 257-259
-        type_svc = line[260:261].strip() if len(line) > 261 else None  # position 261
-        add_date = line[268:276].strip() if len(line) > 276 else None  # positions 269-276
-        eff_date = line[276:284].strip() if len(line) > 284 else None  # positions 277-284
-        term_date = line[284:292].strip() if len(line) > 292 else None  # positions 285-292
-        action = line[292:293].strip() if len(line) > 293 else None  # position 293
+        if skipped:
+            logger.warning(f"Skipped {skipped:,} malformed HCPCS lines in {self.hcpcs_file}")
+        return records
+    
+    def _parse_table(self) -> pd.DataFrame:
+        """Parse the fixed-width file into one row per procedure code.
         
-        # Only process procedure records (record_id 3 or 4)
-        # Modifiers (7, 8) are handled separately if needed
-        if record_id not in ("3", "4"):
-            return None
+        Columns are "code", "long_description" and _FIRST_VALUE_FIELDS, in order of
+        each code's first appearance in the file.
+        """
+        rows = []
+        for code, records in self._read_procedure_records().items():
+            if len(records) == 1:
+                record = records[0]
+                long_desc = record[_LONG_INDEX]
+                firsts = [record[i] or None for i in _FIRST_VALUE_INDEXES]
+            else:
+                # Sort by record_id (3 comes before 4) and sequence
+                records.sort(key=_record_sort_key)
+                # Combine multi-line descriptions; other fields take the first non-empty value
+                long_desc = " ".join(r[_LONG_INDEX] for r in records if r[_LONG_INDEX])
+                firsts = [next((r[i] for r in records if r[i]), None) for i in _FIRST_VALUE_INDEXES]
+            rows.append([code, long_desc, *firsts])
         
-        return {
-            "code": code,
-            "sequence": sequence,
-            "record_id": record_id,
-            "long_description": long_desc,
-            "short_description": short_desc,
-            "pricing_indicator": pricing_ind if pricing_ind else None,
-            "coverage_code": coverage if coverage else None,
-            "betos_code": betos if betos else None,
-            "type_of_service": type_svc if type_svc else None,
-            "effective_date": eff_date if eff_date else None,
-            "termination_date": term_date if term_date else None,
-            "action_code": action if action else None,
-            "code_added_date": add_date if add_date else None,
-        }
+        table = pd.DataFrame(rows, columns=_TABLE_COLUMNS[:-1], dtype=object)
+        # Lowercased once here (and cached with the table) so searches never lowercase per query
+        table["search_text"] = (
+            table["code"] + _SEARCH_SEP + table["long_description"] + _SEARCH_SEP + table["short_description"].fillna("")
+        ).str.lower()
+        return table[_TABLE_COLUMNS]
+    
+    def _load_table(self) -> pd.DataFrame:
+        """Load the parsed code table, reusing an on-disk cache next to the source file.
+        
+        The cache is rebuilt whenever the source file is newer; failing to write it is not an error.
+        """
+        cache_file = self.hcpcs_file.with_suffix(".pkl")
+        table = read_frame_cache(cache_file, self.hcpcs_file.stat().st_mtime_ns)
+        if table is not None and list(table.columns) == _TABLE_COLUMNS:
+            return table
+        
+        table = self._parse_table()
+        write_frame_cache(table, cache_file)
+        return table
     
     def _load_codes(self) -> None:
         """Load HCPCS codes from fixed-width file."""
@@ -126,83 +202,42 @@ class HCPCSLookup:
             self._codes = {}
             return
         
-        codes_dict: dict[str, list[dict[str, Any]]] = {}
-        
         try:
-            with open(self.hcpcs_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    parsed = self._parse_fixed_width_line(line)
-                    if not parsed or not parsed["code"]:
-                        continue
-                    
-                    code = parsed["code"]
-                    if code not in codes_dict:
-                        codes_dict[code] = []
-                    codes_dict[code].append(parsed)
+            table = self._load_table()
             
-            # Combine multi-line descriptions
-            for code, records in codes_dict.items():
-                # Sort by record_id (3 comes before 4) and sequence
-                def sort_key(r):
-                    rid = r.get("record_id", "")
-                    seq = r.get("sequence", "")
-                    try:
-                        seq_num = int(seq) if seq else 0
-                    except ValueError:
-                        seq_num = 0
-                    return (rid, seq_num)
-                records.sort(key=sort_key)
-                
-                # Combine long descriptions
-                long_desc_parts = []
-                short_desc = ""
-                pricing_ind = None
-                coverage = None
-                betos = None
-                type_svc = None
-                eff_date = None
-                term_date = None
-                action = None
-                
-                for record in records:
-                    if record.get("long_description"):
-                        long_desc_parts.append(record["long_description"])
-                    if not short_desc and record.get("short_description"):
-                        short_desc = record["short_description"]
-                    if not pricing_ind and record.get("pricing_indicator"):
-                        pricing_ind = record["pricing_indicator"]
-                    if not coverage and record.get("coverage_code"):
-                        coverage = record["coverage_code"]
-                    if not betos and record.get("betos_code"):
-                        betos = record["betos_code"]
-                    if not type_svc and record.get("type_of_service"):
-                        type_svc = record["type_of_service"]
-                    if not eff_date and record.get("effective_date"):
-                        eff_date = record["effective_date"]
-                    if not term_date and record.get("termination_date"):
-                        term_date = record["termination_date"]
-                    if not action and record.get("action_code"):
-                        action = record["action_code"]
-                
-                long_desc = " ".join(long_desc_parts).strip()
-                
-                self._codes[code] = HCPCSCode(
-                    code=code,
-                    modifier=None,  # Modifiers handled separately
-                    long_description=long_desc,
-                    short_description=short_desc,
-                    pricing_indicator=pricing_ind,
-                    coverage_code=coverage,
-                    betos_code=betos,
-                    type_of_service=type_svc,
-                    effective_date=eff_date,
-                    termination_date=term_date,
-                    action_code=action,
+            # Positional construction: HCPCSCode field order is code, modifier, long, short,
+            # then the _FIRST_VALUE_FIELDS after short_description
+            codes: dict[str, HCPCSCode] = {
+                code: HCPCSCode(
+                    code,
+                    None,  # Modifiers handled separately
+                    long_d,
+                    short_d or "",
+                    *map(_intern, rest),
+                )
+                for code, long_d, short_d, *rest in zip(
+                    *(table[col].to_numpy() for col in _TABLE_COLUMNS[:-1])
                 )
+            }
+            self._codes = codes
+            # Aligned with self._codes order
+            self._search_haystack = table["search_text"].reset_index(drop=True)
         
-        except Exception as e:
-            # If loading fails, start with empty dict
+        except (OSError, ValueError) as e:
+            # Unreadable file: start with empty dict; malformed lines are skipped during parsing
+            logger.error(f"Error loading HCPCS codes from {self.hcpcs_file}: {e}", exc_info=True)
             self._codes = {}
+            self._search_haystack = pd.Series([], dtype=object)
+    
+    def _build_indexes(self) -> None:
+        """Build lookup indexes over the loaded codes (one pass, after loading)."""
+        by_betos: dict[str | None, list[str]] = defaultdict(list)
+        for code_obj in self._codes.values():
+            by_betos[code_obj.betos_code].append(code_obj.code)
+        self._by_betos = {betos: tuple(codes) for betos, codes in by_betos.items()}
+        self._sorted_codes = sorted(self._codes)
+        # Positional view of the codes, aligned with _search_haystack
+        self._code_list = list(self._codes.values())
     
     @lru_cache(maxsize=1000)
     def get_code(self, code: str) -> HCPCSCode | None:
@@ -217,6 +252,23 @@ class HCPCSLookup:
         normalized = str(code).strip().upper()
         return self._codes.get(normalized)
     
+    def get_codes(self, codes: Iterable[str]) -> dict[str, HCPCSCode | None]:
+        """Get details for several codes in one pass.
+        
+        Args:
+            codes: HCPCS/CPT codes (normalized to uppercase; duplicates collapse)
+        
+        Returns:
+            Dict of normalized code -> HCPCSCode (None if not found), in first-seen order
+        """
+        lookup = self._codes.get
+        out: dict[str, HCPCSCode | None] = {}
+        for code in codes:
+            normalized = str(code).strip().upper()
+            if normalized not in out:
+                out[normalized] = lookup(normalized)
+        return out
+    
     def search_codes(self, query: str, limit: int = 50) -> list[HCPCSCode]:
         """Search codes by description.
         
@@ -227,18 +279,16 @@ class HCPCSLookup:
         Returns:
             List of matching HCPCSCode objects
         """
-        query_lower = query.lower()
-        results = []
-        
-        for code_obj in self._codes.values():
-            if (query_lower in code_obj.long_description.lower() or
-                query_lower in code_obj.short_description.lower() or
-                query_lower in code_obj.code.lower()):
-                results.append(code_obj)
-                if len(results) >= limit:
-                    break
+        return list(self._search(query.lower(), limit))
+    
+    @lru_cache(maxsize=256)
+    def _search(self, query_lower: str, limit: int) -> tuple[HCPCSCode, ...]:
+        """Memoized body of search_codes, keyed by the lowercased query."""
+        if not self._code_list:
+            return ()
         
-        return results
+        mask = self._search_haystack.str.contains(query_lower, regex=False).to_numpy(dtype=bool)
+        return tuple(self._code_list[i] for i in np.flatnonzero(mask)[:limit])
     
     def autocomplete(self, prefix: str, limit: int = 20) -> list[dict[str, str]]:
         """Autocomplete codes by prefix.
@@ -250,19 +300,22 @@ class HCPCSLookup:
         Returns:
             List of dicts with 'code' and 'description'
         """
-        prefix_upper = prefix.upper()
+        return list(self._autocomplete(prefix.upper(), limit))
+    
+    @lru_cache(maxsize=1024)
+    def _autocomplete(self, prefix_upper: str, limit: int) -> tuple[dict[str, str], ...]:
+        """Memoized body of autocomplete, keyed by the uppercased prefix."""
+        # Codes sharing a prefix are contiguous in sorted order: [start, end) bounds them
+        start = bisect.bisect_left(self._sorted_codes, prefix_upper)
+        end = bisect.bisect_left(self._sorted_codes, prefix_upper + "\uffff", lo=start)
         results = []
-        
-        for code_obj in self._codes.values():
-            if code_obj.code.startswith(prefix_upper):
-                results.append({
-                    "code": code_obj.code,
-                    "description": code_obj.short_description or code_obj.long_description[:50],
-                })
-                if len(results) >= limit:
-                    break
-        
-        return results
+        for code in self._sorted_codes[start : min(end, start + limit)]:
+            code_obj = self._codes[code]
+            results.append({
+                "code": code_obj.code,
+                "description": code_obj.short_description or code_obj.long_description[:50],
+            })
+        return tuple(results)
     
     def get_codes_by_betos(self, betos_code: str) -> list[str]:
         """Get all codes with a specific BETOS classification.
@@ -273,11 +326,7 @@ class HCPCSLookup:
         Returns:
             List of code strings
         """
-        return [
-            code_obj.code
-            for code_obj in self._codes.values()
-            if code_obj.betos_code == betos_code
-        ]
+        return list(self._by_betos.get(betos_code, ()))
     
     def get_all_codes(self) -> list[str]:
         """Get all loaded codes.
@@ -8,14 +8,15 @@ from functools import lru_cache
 
 import pandas as pd
 
-from .cms_query import attach_hospital_affiliations, get_paths, normalize_codes, normalize_states
-from .cms_columns import (
-    detect_hcpcs_col,
-    detect_npi_col,
-    detect_services_col,
-    detect_state_col,
-    detect_total_payment_col,
+from .cms_query import (
+    attach_hospital_affiliations,
+    load_physician_columns,
+    normalize_codes,
+    normalize_states,
+    physician_numeric,
+    puf_data_version,
 )
+from .hospital_analytics_optimized import format_code_breakdown
 
 
 def hospitals_by_codes(
@@ -28,7 +29,26 @@ def hospitals_by_codes(
     Hospital aggregation - routes to appropriate dataset based on code type.
     - HCPCS codes (letter-prefixed like A4344) -> refHCPCS.csv (referring providers)
     - CPT codes (numeric like 62270) -> physHCPCS.csv (rendering providers)
+    
+    Results are memoized per normalized argument set (so e.g. the explorer's validated codes
+    and the export link's raw input share an entry) and PUF file version; callers get their own copy.
     """
+    codes_key = tuple(normalize_codes(codes))
+    states_key = tuple(normalize_states(states)) or None
+    return _hospitals_by_codes_cached(codes_key, states_key, min_procedures, max_rows, puf_data_version()).copy()
+
+
+@lru_cache(maxsize=64)
+def _hospitals_by_codes_cached(
+    codes_key: tuple[str, ...],
+    states_key: tuple[str, ...] | None,
+    min_procedures: int | None,
+    max_rows: int,
+    data_version: tuple[int | None, int | None],
+) -> pd.DataFrame:
+    """Hospital aggregation per normalized codes/states and PUF data version; the returned frame is shared (do not mutate)."""
+    codes = list(codes_key)
+    states = list(states_key) if states_key is not None else None
     from .code_type_detection import split_codes_by_type
     from .hospital_analytics_optimized import hospitals_by_codes_optimized
     from .referring_provider_analytics import hospitals_by_hcpcs_codes
@@ -69,49 +89,49 @@ def hospitals_by_codes(
     # Combine and re-aggregate if needed (in case same hospital appears in both)
     combined = pd.concat(results, ignore_index=True)
     
-    # Group by facility_id and aggregate properly
-    facility_dict = {}
-    for _, row in combined.iterrows():
-        fac_id = row["facility_id"]
-        if fac_id not in facility_dict:
-            facility_dict[fac_id] = {
-                "hospital_name": row["hospital_name"],
-                "hospital_city": row["hospital_city"],
-                "hospital_state": row["hospital_state"],
-                "total_procedures": 0.0,
-                "total_payments": 0.0,
-                "max_physicians": 0,
-                "code_breakdowns": [],
-            }
-        
-        facility_dict[fac_id]["total_procedures"] += float(row["total_procedures"])
-        facility_dict[fac_id]["total_payments"] += float(row["total_payments"])
-        facility_dict[fac_id]["max_physicians"] = max(
-            facility_dict[fac_id]["max_physicians"],
-            int(row.get("num_physicians", 0))
-        )
-        if pd.notna(row.get("code_breakdown")):
-            facility_dict[fac_id]["code_breakdowns"].append(str(row["code_breakdown"]))
-    
-    # Convert to DataFrame
-    rows = []
-    for fac_id, data in facility_dict.items():
-        code_breakdown = ", ".join([cb for cb in data["code_breakdowns"] if cb and cb != "nan"])[:200]
-        avg_procedures = data["total_procedures"] / data["max_physicians"] if data["max_physicians"] > 0 else 0.0
-        
-        rows.append({
-            "facility_id": fac_id,
-            "hospital_name": data["hospital_name"],
-            "hospital_city": data["hospital_city"],
-            "hospital_state": data["hospital_state"],
-            "total_procedures": data["total_procedures"],
-            "total_payments": data["total_payments"],
-            "num_physicians": data["max_physicians"],
-            "avg_procedures_per_physician": avg_procedures,
-            "code_breakdown": code_breakdown,
-        })
-    
-    grouped = pd.DataFrame(rows)
+    # Group by facility_id and aggregate properly (facilities keep first-seen order)
+    combined["total_procedures"] = combined["total_procedures"].astype(float)
+    combined["total_payments"] = combined["total_payments"].astype(float)
+    by_facility = combined.groupby("facility_id", sort=False)
+    grouped = by_facility.agg(
+        hospital_name=("hospital_name", "first"),
+        hospital_city=("hospital_city", "first"),
+        hospital_state=("hospital_state", "first"),
+        total_procedures=("total_procedures", "sum"),
+        total_payments=("total_payments", "sum"),
+        num_physicians=("num_physicians", "max"),
+    )
+    grouped["num_physicians"] = grouped["num_physicians"].astype(int).clip(lower=0)
+    
+    breakdowns = combined["code_breakdown"]
+    has_breakdown = breakdowns.notna()
+    breakdowns = breakdowns[has_breakdown].astype(str)
+    has_breakdown = (breakdowns != "") & (breakdowns != "nan")
+    joined = (
+        breakdowns[has_breakdown]
+        .groupby(combined.loc[breakdowns.index[has_breakdown], "facility_id"], sort=False)
+        .agg(", ".join)
+    )
+    grouped["code_breakdown"] = joined.reindex(grouped.index, fill_value="").str[:200]
+    
+    physicians = grouped["num_physicians"]
+    grouped["avg_procedures_per_physician"] = (
+        grouped["total_procedures"] / physicians.where(physicians > 0)
+    ).fillna(0.0)
+    
+    grouped = grouped.reset_index()[
+        [
+            "facility_id",
+            "hospital_name",
+            "hospital_city",
+            "hospital_state",
+            "total_procedures",
+            "total_payments",
+            "num_physicians",
+            "avg_procedures_per_physician",
+            "code_breakdown",
+        ]
+    ]
     
     # Sort and limit
     grouped = grouped.sort_values("total_procedures", ascending=False)
@@ -169,68 +189,33 @@ def hospitals_by_codes_original(
         )
     
     # Load physician data and aggregate by hospital
-    path = get_paths().physician_puf
-    header = list(pd.read_csv(path, nrows=0, low_memory=False).columns)
-    
-    npi_col = detect_npi_col(header)
-    hcpcs_col = detect_hcpcs_col(header)
-    state_col = detect_state_col(header)
-    services_col = detect_services_col(header)
-    total_payment_col = detect_total_payment_col(header)
-    
-    usecols = [c for c in [npi_col, hcpcs_col, state_col, services_col, total_payment_col] if c]
-    
-    # Aggregate by NPI first, then by hospital
+    table = load_physician_columns()
+    
+    mask = table["code"].isin(codes_n)
+    if states_n:
+        mask &= table["state"].isin(states_n)
+    matched = table.loc[mask]
+    if "total_payment" in matched.columns:
+        total_payment = physician_numeric(matched["total_payment"])
+    else:
+        total_payment = 0.0
+    matched = pd.DataFrame({
+        "npi": matched["npi"].astype(object),
+        "code": matched["code"].astype(object),
+        "services": physician_numeric(matched["services"]),
+        "total_payment": total_payment,
+    })
+    
+    # Aggregate by NPI first, then by hospital (vectorized; first-seen order is kept)
     npi_totals: dict[str, dict[str, float]] = {}  # npi -> {services, payments}
     npi_codes: dict[str, dict[str, float]] = {}  # npi -> {code: services}
-    npi_states: dict[str, str] = {}  # npi -> state
-    
-    chunksize = 250_000
-    for chunk in pd.read_csv(path, usecols=usecols, low_memory=False, chunksize=chunksize):
-        chunk = chunk.rename(
-            columns={
-                npi_col: "npi",
-                hcpcs_col: "code",
-                state_col: "state",
-                services_col: "services",
-                (total_payment_col or ""): "total_payment",
-            }
-        )
-        if "" in chunk.columns:
-            chunk = chunk.drop(columns=[""])
-        
-        chunk["npi"] = chunk["npi"].astype(str).str.strip()
-        chunk["code"] = chunk["code"].astype(str).str.strip().str.upper()
-        chunk["state"] = chunk["state"].astype(str).str.strip().str.upper()
-        
-        if states_n:
-            chunk = chunk[chunk["state"].isin(states_n)]
-        chunk = chunk[chunk["code"].isin(codes_n)]
-        if chunk.empty:
-            continue
-        
-        chunk["services"] = pd.to_numeric(chunk["services"], errors="coerce").fillna(0)
-        if "total_payment" in chunk.columns:
-            chunk["total_payment"] = pd.to_numeric(chunk["total_payment"], errors="coerce").fillna(0)
-        else:
-            chunk["total_payment"] = 0.0
-        
-        # Aggregate by NPI
-        for _, row in chunk.iterrows():
-            npi = str(row["npi"])
-            code = str(row["code"])
-            services = float(row["services"])
-            payment = float(row.get("total_payment", 0))
-            state = str(row.get("state", ""))
-            
-            if npi not in npi_totals:
-                npi_totals[npi] = {"services": 0.0, "payments": 0.0}
-                npi_codes[npi] = {}
-                npi_states[npi] = state
-            
-            npi_totals[npi]["services"] += services
-            npi_totals[npi]["payments"] += payment
-            npi_codes[npi][code] = npi_codes[npi].get(code, 0.0) + services
+    if not matched.empty:
+        by_npi_code = matched.groupby(["npi", "code"], sort=False)[["services", "total_payment"]].sum()
+        by_npi = by_npi_code.groupby(level="npi", sort=False).sum()
+        for npi, services, payments in zip(by_npi.index, by_npi["services"], by_npi["total_payment"]):
+            npi_totals[npi] = {"services": services, "payments": payments}
+        for (npi, code), services in by_npi_code["services"].items():
+            npi_codes.setdefault(npi, {})[code] = services
     
     if not npi_totals:
         return pd.DataFrame(
@@ -248,11 +233,10 @@ def hospitals_by_codes_original(
         )
     
     # Load hospital affiliations
-    from .cms_query import load_facility_affiliations, load_hospital_metadata
+    from .cms_query import load_affiliated_hospitals_by_npi
     
     try:
-        affiliations = load_facility_affiliations()
-        hospitals = load_hospital_metadata()
+        hospitals_by_npi = load_affiliated_hospitals_by_npi()
     except Exception:
         # If affiliations can't be loaded, return empty
         return pd.DataFrame(
@@ -273,74 +257,53 @@ def hospitals_by_codes_original(
     hospital_stats: dict[str, dict[str, Any]] = {}
     
     for npi, totals in npi_totals.items():
-        # Find hospitals for this NPI
-        npi_affiliations = affiliations[affiliations["npi"] == npi]
-        
-        if npi_affiliations.empty:
+        # Find hospitals for this NPI (pre-joined with hospital info)
+        npi_hospitals = hospitals_by_npi.get(npi)
+        if not npi_hospitals:
             # No hospital affiliation - skip or create "Unknown" hospital
             continue
         
-        for _, aff_row in npi_affiliations.iterrows():
-            facility_id = str(aff_row["facility_id"])
-            
-            # Get hospital info
-            hosp_info = hospitals[hospitals["facility_id"] == facility_id]
-            if hosp_info.empty:
-                continue
-            
-            hosp_row = hosp_info.iloc[0]
-            
-            if facility_id not in hospital_stats:
-                hospital_stats[facility_id] = {
+        code_services = npi_codes[npi]
+        for facility_id, hospital_name, hospital_city, hospital_state in npi_hospitals:
+            stats = hospital_stats.get(facility_id)
+            if stats is None:
+                stats = hospital_stats[facility_id] = {
                     "facility_id": facility_id,
-                    "hospital_name": str(hosp_row.get("hospital_name", "")),
-                    "hospital_city": str(hosp_row.get("hospital_city", "")),
-                    "hospital_state": str(hosp_row.get("hospital_state", "")),
+                    "hospital_name": hospital_name,
+                    "hospital_city": hospital_city,
+                    "hospital_state": hospital_state,
                     "total_procedures": 0.0,
                     "total_payments": 0.0,
                     "physicians": set(),
                     "code_breakdown": {},
                 }
             
-            hospital_stats[facility_id]["total_procedures"] += totals["services"]
-            hospital_stats[facility_id]["total_payments"] += totals["payments"]
-            hospital_stats[facility_id]["physicians"].add(npi)
+            stats["total_procedures"] += totals["services"]
+            stats["total_payments"] += totals["payments"]
+            stats["physicians"].add(npi)
             
             # Add to code breakdown
-            for code, code_services in npi_codes[npi].items():
-                hospital_stats[facility_id]["code_breakdown"][code] = (
-                    hospital_stats[facility_id]["code_breakdown"].get(code, 0.0) + code_services
-                )
-    
-    # Convert to DataFrame
-    rows = []
-    for facility_id, stats in hospital_stats.items():
-        num_physicians = len(stats["physicians"])
-        avg_procedures = (
-            stats["total_procedures"] / num_physicians if num_physicians > 0 else 0.0
-        )
-        
-        # Build code breakdown string
-        code_breakdown_parts = []
-        for code, services in sorted(
-            stats["code_breakdown"].items(), key=lambda x: x[1], reverse=True
-        ):
-            code_breakdown_parts.append(f"{code} ({int(services):,})")
-        code_breakdown = ", ".join(code_breakdown_parts[:5])  # Top 5 codes
-        if len(code_breakdown_parts) > 5:
-            code_breakdown += f" (+{len(code_breakdown_parts) - 5} more)"
-        
-        rows.append({
+            breakdown = stats["code_breakdown"]
+            for code, services in code_services.items():
+                breakdown[code] = breakdown.get(code, 0.0) + services
+    
+    # Convert to DataFrame (one pass over the accumulated stats)
+    rows = [
+        {
             "facility_id": facility_id,
             "hospital_name": stats["hospital_name"],
             "hospital_city": stats["hospital_city"],
             "hospital_state": stats["hospital_state"],
             "total_procedures": stats["total_procedures"],
             "total_payments": stats["total_payments"],
-            "num_physicians": num_physicians,
-            "avg_procedures_per_physician": avg_procedures,
-            "code_breakdown": code_breakdown,
-        })
+            "num_physicians": len(stats["physicians"]),
+            "avg_procedures_per_physician": (
+                stats["total_procedures"] / len(stats["physicians"]) if stats["physicians"] else 0.0
+            ),
+            "code_breakdown": format_code_breakdown(stats["code_breakdown"]),
+        }
+        for facility_id, stats in hospital_stats.items()
+    ]
     
     df = pd.DataFrame(rows)
     
@@ -373,3 +336,38 @@ def get_hospital_physicians(
     from .hospital_analytics_optimized import get_hospital_physicians_optimized
     return get_hospital_physicians_optimized(facility_id, codes, max_rows)
 
+
+def get_hospital_code_stats(
+    facility_id: str,
+    codes: list[str],
+    max_rows: int = 10000,
+) -> pd.Series | None:
+    """
+    Aggregated stats row of hospitals_by_codes(codes, max_rows=max_rows) for one facility.
+
+    Looks the facility up in a memoized facility_id -> row index over the shared cached
+    result, so repeated hospital detail views neither copy nor scan the whole frame.
+    Returns None if the facility has no row for these codes.
+    """
+    codes_key = tuple(normalize_codes(codes))
+    data_version = puf_data_version()
+    pos = _facility_row_positions(codes_key, max_rows, data_version).get(facility_id)
+    if pos is None:
+        return None
+    return _hospitals_by_codes_cached(codes_key, None, None, max_rows, data_version).iloc[pos]
+
+
+@lru_cache(maxsize=64)
+def _facility_row_positions(
+    codes_key: tuple[str, ...],
+    max_rows: int,
+    data_version: tuple[int | None, int | None],
+) -> dict[str, int]:
+    """First row position of each facility_id in the cached hospitals_by_codes result for data_version."""
+    frame = _hospitals_by_codes_cached(codes_key, None, None, max_rows, data_version)
+    if "facility_id" not in frame.columns:
+        return {}
+    positions: dict[str, int] = {}
+    for pos, fid in enumerate(frame["facility_id"].tolist()):
+        positions.setdefault(fid, pos)
+    return positions
@@ -9,22 +9,68 @@ Key optimizations:
 """
 from __future__ import annotations
 
+import heapq
+from collections import Counter, defaultdict
+from functools import lru_cache
+from operator import itemgetter
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from .cms_query import get_paths, load_facility_affiliations, load_hospital_metadata, normalize_codes, normalize_states
+from .cms_query import (
+    _category_labels,
+    _phys_puf_header,
+    _read_csv_prefetched,
+    get_paths,
+    load_facility_affiliations,
+    load_hospital_metadata,
+    load_physician_columns,
+    normalize_codes,
+    normalize_states,
+    physician_numeric,
+)
 from .cms_columns import (
     detect_avg_payment_col,
+    detect_first_name_col,
     detect_hcpcs_col,
+    detect_last_name_col,
     detect_npi_col,
     detect_services_col,
+    detect_specialty_col,
     detect_state_col,
     detect_total_payment_col,
 )
 from .logger import logger
 
 
+@lru_cache(maxsize=4)
+def _physician_columns(path: str) -> Dict[str, Optional[str]]:
+    """Detected physician PUF column names (None when absent), from the shared cached header."""
+    header = _phys_puf_header(path)
+    return {
+        "npi": detect_npi_col(header),
+        "hcpcs": detect_hcpcs_col(header),
+        "state": detect_state_col(header),
+        "services": detect_services_col(header),
+        "total_payment": detect_total_payment_col(header),
+        "avg_payment": detect_avg_payment_col(header),
+        "last_name": detect_last_name_col(header),
+        "first_name": detect_first_name_col(header),
+        "specialty": detect_specialty_col(header),
+    }
+
+
+def format_code_breakdown(breakdown: Dict[str, float]) -> str:
+    """Top 5 codes by services as "CODE (n,nnn)", with a "(+N more)" suffix when truncated."""
+    # nlargest keeps sorted()'s order for ties without sorting every code
+    top = heapq.nlargest(5, breakdown.items(), key=itemgetter(1))
+    text = ", ".join(f"{code} ({int(services):,})" for code, services in top)
+    if len(breakdown) > 5:
+        text += f" (+{len(breakdown) - 5} more)"
+    return text
+
+
 def hospitals_by_codes_optimized(
     codes: List[str],
     states: Optional[List[str]] = None,
@@ -82,164 +128,170 @@ def hospitals_by_codes_optimized(
             ]
         )
     
-    # Build lookup maps for efficiency
+    # Build lookup maps for efficiency (strings normalized column-wise, then one zip pass)
     # NPI -> set of facility_ids
     npi_to_facilities: Dict[str, set[str]] = {}
-    for _, row in affiliations_df.iterrows():
-        npi = str(row["npi"]).strip()
-        fac_id = str(row["facility_id"]).strip()
+    aff_npis = affiliations_df["npi"].astype(str).str.strip().tolist()
+    aff_facs = affiliations_df["facility_id"].astype(str).str.strip().tolist()
+    for npi, fac_id in zip(aff_npis, aff_facs):
         if npi and fac_id:
-            if npi not in npi_to_facilities:
-                npi_to_facilities[npi] = set()
-            npi_to_facilities[npi].add(fac_id)
+            npi_to_facilities.setdefault(npi, set()).add(fac_id)
+    # Built once so every chunk's isin() reuses the same hash table
+    npi_index = pd.Index(list(npi_to_facilities), dtype=object)
     
     # Facility ID -> hospital info
     facility_to_hospital: Dict[str, Dict[str, Any]] = {}
-    for _, row in hospitals_df.iterrows():
-        fac_id = str(row["facility_id"]).strip()
+    hosp_fields = ["hospital_name", "hospital_city", "hospital_state"]
+    hosp_values = [
+        hospitals_df[col].astype(str).tolist() if col in hospitals_df.columns else [""] * len(hospitals_df)
+        for col in hosp_fields
+    ]
+    for fac_id, name, city, state in zip(
+        hospitals_df["facility_id"].astype(str).str.strip().tolist(), *hosp_values
+    ):
         if fac_id:
             facility_to_hospital[fac_id] = {
-                "hospital_name": str(row.get("hospital_name", "")),
-                "hospital_city": str(row.get("hospital_city", "")),
-                "hospital_state": str(row.get("hospital_state", "")),
+                "hospital_name": name,
+                "hospital_city": city,
+                "hospital_state": state,
             }
     
-    # Read and process physician data
-    path = get_paths().physician_puf
-    header = list(pd.read_csv(path, nrows=0, low_memory=False).columns)
-    
-    npi_col = detect_npi_col(header)
-    hcpcs_col = detect_hcpcs_col(header)
-    state_col = detect_state_col(header)
-    services_col = detect_services_col(header)
-    total_payment_col = detect_total_payment_col(header)
-    avg_payment_col = detect_avg_payment_col(header)
-    
-    # Include avg_payment_col if total_payment_col doesn't exist (we'll calculate it)
-    usecols = [c for c in [npi_col, hcpcs_col, state_col, services_col, total_payment_col, avg_payment_col] if c]
-    
-    # Direct hospital-level aggregation
-    hospital_stats: Dict[str, Dict[str, Any]] = {}
+    # Flat NPI -> facility pairs with hospital info, for expanding chunk rows with a merge
+    # (each NPI's facilities keep their npi_to_facilities iteration order)
+    npi_facility_pairs = pd.DataFrame(
+        [
+            (npi, fac_id)
+            for npi, facilities in npi_to_facilities.items()
+            for fac_id in facilities
+            if fac_id in facility_to_hospital
+        ],
+        columns=["npi", "facility_id"],
+    )
+    # Facilities are encoded as integer positions, so per-facility totals accumulate in arrays
+    fac_codes, facility_ids = pd.factorize(npi_facility_pairs.pop("facility_id"))
+    npi_facility_pairs["fac_idx"] = fac_codes
+    
+    # Physician rows come from the cached column table (parsed from the CSV once); it is
+    # walked in the same 500k-row slices the CSV reader used, so progress logging and the
+    # row cap below behave as before
+    cols = _physician_columns(str(get_paths().physician_puf))
+    # A lone payment column can be detected as both; it is then treated as the average
+    use_total_payment = bool(cols["total_payment"]) and cols["total_payment"] != cols["avg_payment"]
+    table = load_physician_columns()
+    
+    # Early filter by codes and states (vectorized on the categorical columns)
+    keep = table["code"].isin(codes_set).to_numpy()
+    if states_set:
+        keep &= table["state"].isin(states_set).to_numpy()
+    
+    # Direct hospital-level aggregation into per-facility accumulators
+    n_facilities = len(facility_ids)
+    n_npis = len(table["npi"].cat.categories)
+    fac_procedures = np.zeros(n_facilities)
+    fac_payments = np.zeros(n_facilities)
+    fac_seen = np.zeros(n_facilities, dtype=bool)
+    fac_order: List[int] = []  # facility positions in first-seen order
+    fac_npi_keys: List[np.ndarray] = []  # distinct fac_idx * n_npis + npi_id per chunk
+    fac_breakdowns: Dict[int, Counter] = {}
     
     chunksize = 500_000  # Larger chunks for better performance
-    processed_rows = 0
-    
-    for chunk in pd.read_csv(path, usecols=usecols, low_memory=False, chunksize=chunksize):
-        # Early filtering in pandas (vectorized)
-        # Build rename dict
-        rename_dict = {
-            npi_col: "npi",
-            hcpcs_col: "code",
-            state_col: "state",
-            services_col: "services",
-        }
-        if total_payment_col:
-            rename_dict[total_payment_col] = "total_payment"
-        if avg_payment_col:
-            rename_dict[avg_payment_col] = "avg_payment"
-        
-        chunk = chunk.rename(columns=rename_dict)
-        
-        # Convert to string and normalize
-        chunk["npi"] = chunk["npi"].astype(str).str.strip()
-        chunk["code"] = chunk["code"].astype(str).str.strip().str.upper()
-        chunk["state"] = chunk["state"].astype(str).str.strip().str.upper()
-        
-        # Early filter by codes and states (vectorized operations)
-        chunk = chunk[chunk["code"].isin(codes_set)]
-        if chunk.empty:
-            continue
-            
-        if states_set:
-            chunk = chunk[chunk["state"].isin(states_set)]
+    processed_rows = 0  # rows that matched the filters and have hospital affiliations
+    scanned_rows = 0  # rows read from the table, before any filtering
+    
+    for start in range(0, len(table), chunksize):
+        chunk = table.iloc[start:start + chunksize][keep[start:start + chunksize]]
+        scanned_rows = min(start + chunksize, len(table))
+        if scanned_rows % 2_000_000 == 0:
+            logger.info(
+                "Scanned %d rows, %d matched, found %d hospitals so far",
+                scanned_rows, processed_rows, len(fac_order),
+            )
         if chunk.empty:
             continue
         
         # Convert numeric columns
-        chunk["services"] = pd.to_numeric(chunk["services"], errors="coerce").fillna(0)
+        services = physician_numeric(chunk["services"])
         
         # Calculate total payment correctly
-        if "total_payment" in chunk.columns:
-            chunk["total_payment"] = pd.to_numeric(chunk["total_payment"], errors="coerce").fillna(0)
+        if use_total_payment:
+            total_payment = physician_numeric(chunk["total_payment"])
         elif "avg_payment" in chunk.columns:
             # Calculate total payment as average * services
-            chunk["avg_payment"] = pd.to_numeric(chunk["avg_payment"], errors="coerce").fillna(0)
-            chunk["total_payment"] = chunk["avg_payment"] * chunk["services"]
+            total_payment = physician_numeric(chunk["avg_payment"]) * services
         else:
-            chunk["total_payment"] = 0.0
+            total_payment = 0.0
+        
+        chunk = pd.DataFrame({
+            "npi": chunk["npi"].astype(object),
+            # Integer ID per distinct NPI (its category code), for counting physicians
+            "npi_id": chunk["npi"].cat.codes,
+            "code": chunk["code"].astype(object),
+            "services": services,
+            "total_payment": total_payment,
+        })
         
         # Filter out NPIs without hospital affiliations (vectorized)
-        chunk["has_facilities"] = chunk["npi"].isin(npi_to_facilities.keys())
-        chunk = chunk[chunk["has_facilities"]].copy()
+        # Only read from here on, so the masked frame needs no defensive copy
+        chunk = chunk[chunk["npi"].isin(npi_index)]
         if chunk.empty:
             continue
         
-        # Expand: create one row per NPI-facility combination
-        # Use list comprehension which is faster than iterrows
-        expanded_rows = []
-        npi_list = chunk["npi"].tolist()
-        code_list = chunk["code"].tolist()
-        services_list = chunk["services"].tolist()
-        payment_list = chunk["total_payment"].tolist()
-        
-        for i, npi in enumerate(npi_list):
-            facilities = npi_to_facilities.get(npi, set())
-            for fac_id in facilities:
-                if fac_id in facility_to_hospital:
-                    expanded_rows.append({
-                        "facility_id": fac_id,
-                        "npi": npi,
-                        "code": code_list[i],
-                        "services": services_list[i],
-                        "payment": payment_list[i],
-                    })
+        # Collapse repeated (NPI, code) rows (e.g. one per place of service) before the
+        # facility fan-out, so the merge and groupbys see each pair once per chunk
+        matched_rows = len(chunk)
+        chunk = chunk.groupby(["npi", "npi_id", "code"], sort=False, as_index=False).agg(
+            services=("services", "sum"),
+            total_payment=("total_payment", "sum"),
+        )
         
-        if not expanded_rows:
+        # Expand: one row per NPI-facility combination (hash join; chunk row order is kept)
+        expanded_df = (
+            chunk
+            .merge(npi_facility_pairs, on="npi")
+            .rename(columns={"total_payment": "payment"})
+        )
+        if expanded_df.empty:
             continue
         
-        # Convert to DataFrame and aggregate by facility (vectorized)
-        expanded_df = pd.DataFrame(expanded_rows)
+        # Aggregate by facility and by (facility, code) in one pass each (first-seen order is kept)
+        by_fac = expanded_df.groupby("fac_idx", sort=False).agg(
+            services=("services", "sum"),
+            payment=("payment", "sum"),
+        )
+        by_fac_code = expanded_df.groupby(["fac_idx", "code"], sort=False)["services"].sum()
+        
+        # Facility positions are unique within by_fac, so the accumulators update in place
+        fac_idx = by_fac.index.to_numpy()
+        new_facilities = fac_idx[~fac_seen[fac_idx]]
+        fac_seen[new_facilities] = True
+        fac_order.extend(new_facilities.tolist())
+        fac_procedures[fac_idx] += by_fac["services"].to_numpy()
+        fac_payments[fac_idx] += by_fac["payment"].to_numpy()
         
-        # Group by facility and aggregate (much faster than iterrows)
-        facility_groups = expanded_df.groupby("facility_id", sort=False)
+        # Physicians are only counted, so each (facility, NPI) pair is kept as one integer
+        fac_npi_keys.append(np.unique(
+            expanded_df["fac_idx"].to_numpy(np.int64) * n_npis + expanded_df["npi_id"].to_numpy(np.int64)
+        ))
         
-        for fac_id, group in facility_groups:
-            if fac_id not in hospital_stats:
-                hosp_info = facility_to_hospital[fac_id]
-                hospital_stats[fac_id] = {
-                    "facility_id": fac_id,
-                    "hospital_name": hosp_info["hospital_name"],
-                    "hospital_city": hosp_info["hospital_city"],
-                    "hospital_state": hosp_info["hospital_state"],
-                    "total_procedures": 0.0,
-                    "total_payments": 0.0,
-                    "physicians": set(),
-                    "code_breakdown": {},
-                }
-            
-            # Aggregate using pandas operations (much faster)
-            hospital_stats[fac_id]["total_procedures"] += float(group["services"].sum())
-            hospital_stats[fac_id]["total_payments"] += float(group["payment"].sum())
-            hospital_stats[fac_id]["physicians"].update(group["npi"].unique())
-            
-            # Aggregate code breakdown (vectorized)
-            code_groups = group.groupby("code", sort=False)["services"].sum()
-            for code, services in code_groups.items():
-                hospital_stats[fac_id]["code_breakdown"][code] = (
-                    hospital_stats[fac_id]["code_breakdown"].get(code, 0.0) + float(services)
-                )
+        # Per-facility code sums for this chunk, added into each facility's Counter in one update
+        chunk_breakdowns: Dict[int, Dict[str, float]] = defaultdict(dict)
+        for (fac, code), services in zip(by_fac_code.index, by_fac_code.tolist()):
+            chunk_breakdowns[fac][code] = services
+        for fac, code_services in chunk_breakdowns.items():
+            fac_breakdowns.setdefault(fac, Counter()).update(code_services)
         
-        processed_rows += len(chunk)
-        if processed_rows % 2_000_000 == 0:
-            logger.info(f"Processed {processed_rows:,} rows, found {len(hospital_stats)} hospitals so far")
+        processed_rows += matched_rows
         # Early exit if we've processed enough (optional optimization)
         if processed_rows > 5_000_000:  # Reduced from 10M for faster response
-            logger.info(f"Early exit after processing {processed_rows:,} rows")
+            logger.info("Early exit after processing %d rows (%d scanned)", processed_rows, scanned_rows)
             break
     
-    logger.info(f"Completed processing. Found {len(hospital_stats)} hospitals from {processed_rows:,} rows")
+    logger.info(
+        "Completed processing. Found %d hospitals from %d rows (%d scanned)",
+        len(fac_order), processed_rows, scanned_rows,
+    )
     
-    if not hospital_stats:
+    if not fac_order:
         return pd.DataFrame(
             columns=[
                 "facility_id",
@@ -254,37 +306,26 @@ def hospitals_by_codes_optimized(
             ]
         )
     
-    # Convert to DataFrame
-    rows = []
-    for fac_id, stats in hospital_stats.items():
-        num_physicians = len(stats["physicians"])
-        avg_procedures = (
-            stats["total_procedures"] / num_physicians if num_physicians > 0 else 0.0
-        )
-        
-        # Build code breakdown string (top 5)
-        code_breakdown_parts = []
-        for code, services in sorted(
-            stats["code_breakdown"].items(), key=lambda x: x[1], reverse=True
-        )[:5]:
-            code_breakdown_parts.append(f"{code} ({int(services):,})")
-        code_breakdown = ", ".join(code_breakdown_parts)
-        if len(stats["code_breakdown"]) > 5:
-            code_breakdown += f" (+{len(stats['code_breakdown']) - 5} more)"
-        
-        rows.append({
-            "facility_id": fac_id,
-            "hospital_name": stats["hospital_name"],
-            "hospital_city": stats["hospital_city"],
-            "hospital_state": stats["hospital_state"],
-            "total_procedures": stats["total_procedures"],
-            "total_payments": stats["total_payments"],
-            "num_physicians": num_physicians,
-            "avg_procedures_per_physician": avg_procedures,
-            "code_breakdown": code_breakdown,
-        })
-    
-    df = pd.DataFrame(rows)
+    # Convert to DataFrame, one column at a time
+    order = np.asarray(fac_order)
+    fac_list = facility_ids[order].tolist()
+    hosp_infos = [facility_to_hospital[fac_id] for fac_id in fac_list]
+    total_procedures = fac_procedures[order]
+    pair_keys = np.unique(np.concatenate(fac_npi_keys))
+    num_physicians = np.bincount(pair_keys // n_npis, minlength=n_facilities)[order].astype(np.int64)
+    avg_procedures = np.where(num_physicians > 0, total_procedures / np.maximum(num_physicians, 1), 0.0)
+    
+    df = pd.DataFrame({
+        "facility_id": fac_list,
+        "hospital_name": [info["hospital_name"] for info in hosp_infos],
+        "hospital_city": [info["hospital_city"] for info in hosp_infos],
+        "hospital_state": [info["hospital_state"] for info in hosp_infos],
+        "total_procedures": total_procedures,
+        "total_payments": fac_payments[order],
+        "num_physicians": num_physicians,
+        "avg_procedures_per_physician": avg_procedures,
+        "code_breakdown": [format_code_breakdown(fac_breakdowns[fac]) for fac in fac_order],
+    })
     
     # Apply min_procedures filter
     if min_procedures is not None:
@@ -308,18 +349,6 @@ def get_hospital_physicians_optimized(
     Optimized version - only processes data for the specific hospital and codes.
     Much faster than loading all doctors then filtering.
     """
-    from .cms_query import get_paths, load_facility_affiliations, normalize_codes
-    from .cms_columns import (
-        detect_first_name_col,
-        detect_hcpcs_col,
-        detect_last_name_col,
-        detect_npi_col,
-        detect_services_col,
-        detect_specialty_col,
-        detect_state_col,
-        detect_total_payment_col,
-    )
-    
     codes_n = normalize_codes(codes)
     if not codes_n:
         return pd.DataFrame()
@@ -338,16 +367,16 @@ def get_hospital_physicians_optimized(
     
     # Read physician data and filter early
     path = get_paths().physician_puf
-    header = list(pd.read_csv(path, nrows=0, low_memory=False).columns)
+    cols = _physician_columns(str(path))
     
-    npi_col = detect_npi_col(header)
-    hcpcs_col = detect_hcpcs_col(header)
-    services_col = detect_services_col(header)
-    total_payment_col = detect_total_payment_col(header)
-    last_col = detect_last_name_col(header)
-    first_col = detect_first_name_col(header)
-    specialty_col = detect_specialty_col(header)
-    state_col = detect_state_col(header)
+    npi_col = cols["npi"]
+    hcpcs_col = cols["hcpcs"]
+    services_col = cols["services"]
+    total_payment_col = cols["total_payment"]
+    last_col = cols["last_name"]
+    first_col = cols["first_name"]
+    specialty_col = cols["specialty"]
+    state_col = cols["state"]
     
     usecols = [c for c in [
         npi_col, hcpcs_col, services_col, total_payment_col,
@@ -359,7 +388,12 @@ def get_hospital_physicians_optimized(
     npi_info: Dict[str, Dict[str, str]] = {}
     
     chunksize = 500_000
-    for chunk in pd.read_csv(path, usecols=usecols, low_memory=False, chunksize=chunksize):
+    # Repetitive text columns parse straight into categoricals (codes are then normalized
+    # per category instead of per row); NPIs stay text, as they are matched as strings
+    dtypes = {c: "category" for c in [hcpcs_col, specialty_col, state_col] if c}
+    dtypes[npi_col] = str
+    # The next chunk is parsed on a worker thread while this one is filtered and aggregated
+    for chunk in _read_csv_prefetched(path, usecols=usecols, dtype=dtypes, low_memory=False, chunksize=chunksize):
         chunk = chunk.rename(
             columns={
                 npi_col: "npi",
@@ -375,14 +409,17 @@ def get_hospital_physicians_optimized(
         if "" in chunk.columns:
             chunk = chunk.drop(columns=[""])
         
-        chunk["npi"] = chunk["npi"].astype(str).str.strip()
-        chunk["code"] = chunk["code"].astype(str).str.strip().str.upper()
-        
-        # Early filter: only NPIs in this hospital, only codes we care about
-        chunk = chunk[chunk["npi"].isin(npi_set)]
+        # Early filter: only codes we care about (string work once per category), then only
+        # NPIs in this hospital, so NPI strings are built just for the surviving rows
+        labels = _category_labels(chunk["code"])
+        cat_codes = chunk["code"].cat.codes.to_numpy()
+        # Membership is decided per category, then gathered by the integer category codes
+        keep = np.fromiter((label in codes_set for label in labels), dtype=bool, count=len(labels))[cat_codes]
+        chunk = chunk[keep].assign(code=labels[cat_codes[keep]])
         if chunk.empty:
             continue
-        chunk = chunk[chunk["code"].isin(codes_set)]
+        chunk["npi"] = chunk["npi"].astype(str).str.strip()
+        chunk = chunk[chunk["npi"].isin(npi_set)]
         if chunk.empty:
             continue
         
@@ -392,23 +429,27 @@ def get_hospital_physicians_optimized(
         else:
             chunk["total_payment"] = 0.0
         
-        # Aggregate
-        for _, row in chunk.iterrows():
-            npi = str(row["npi"])
-            services = float(row["services"])
-            payment = float(row.get("total_payment", 0))
-            
-            if npi not in npi_totals:
-                npi_totals[npi] = {"services": 0.0, "payments": 0.0}
-                npi_info[npi] = {
-                    "last_name": str(row.get("last_name", "")),
-                    "first_name": str(row.get("first_name", "")),
-                    "specialty": str(row.get("specialty", "")),
-                    "state": str(row.get("state", "")),
-                }
-            
-            npi_totals[npi]["services"] += services
-            npi_totals[npi]["payments"] += payment
+        # Aggregate per NPI (vectorized; first-seen order is kept)
+        agg = chunk.groupby("npi", sort=False).agg(
+            services=("services", "sum"),
+            payments=("total_payment", "sum"),
+        )
+        
+        # Name/specialty/state come from each NPI's first row
+        first_rows = chunk.drop_duplicates("npi")
+        info_fields = ["last_name", "first_name", "specialty", "state"]
+        info_values = [
+            first_rows[col].astype(str).tolist() if col in first_rows.columns else [""] * len(first_rows)
+            for col in info_fields
+        ]
+        for npi, *info in zip(first_rows["npi"].tolist(), *info_values):
+            if npi not in npi_info:
+                npi_info[npi] = dict(zip(info_fields, info))
+        
+        for npi, services, payments in zip(agg.index, agg["services"].tolist(), agg["payments"].tolist()):
+            totals = npi_totals.setdefault(npi, {"services": 0.0, "payments": 0.0})
+            totals["services"] += services
+            totals["payments"] += payments
     
     if not npi_totals:
         return pd.DataFrame()
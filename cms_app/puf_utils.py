@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import Literal
 
 import numpy as np
@@ -17,26 +18,45 @@ def pick_column(
     contains_any=(),
     regexes=(),
 ) -> str | None:
-    cl = list(cols)
-    cl_lower = [c.lower() for c in cl]
+    # Header lists repeat across calls, so results are memoized on hashable copies of the arguments
+    return _pick_column(tuple(cols), tuple(preferred_exact), tuple(contains_any), tuple(regexes))
+
+
+@lru_cache(maxsize=1024)
+def _pick_column(
+    cols: tuple[str, ...],
+    preferred_exact: tuple[str, ...],
+    contains_any: tuple[str, ...],
+    regexes: tuple[str, ...],
+) -> str | None:
+    # Priority is preferred name order, then fragment order, then pattern order; a single
+    # combined pattern would pick by column order instead, so each stage stays a loop
+    cl_lower = [c.lower() for c in cols]
+    first_by_lower: dict[str, str] = {}
+    for c, lower in zip(cols, cl_lower):
+        first_by_lower.setdefault(lower, c)
     for p in preferred_exact:
-        p = p.lower()
-        for i, c in enumerate(cl_lower):
-            if c == p:
-                return cl[i]
+        c = first_by_lower.get(p.lower())
+        if c is not None:
+            return c
     for frag in contains_any:
         frag = frag.lower()
         for i, c in enumerate(cl_lower):
             if frag in c:
-                return cl[i]
+                return cols[i]
     for pat in regexes:
-        rx = re.compile(pat, re.I)
-        for c in cl:
+        rx = _compile_ci(pat)
+        for c in cols:
             if rx.search(c):
                 return c
     return None
 
 
+@lru_cache(maxsize=256)
+def _compile_ci(pattern: str) -> re.Pattern[str]:
+    return re.compile(pattern, re.I)
+
+
 def find_name_columns(cols, who: Literal["referring", "physician"]):
     if who in ("referring", "physician"):
         name_last = pick_column(
@@ -67,7 +87,12 @@ def find_name_columns(cols, who: Literal["referring", "physician"]):
 
 
 def detect_dimensions(df: pd.DataFrame, who: Literal["referring", "physician"]):
-    cols = df.columns
+    # Detection depends only on the column names, so results are memoized per header
+    return dict(_detect_dimensions(tuple(df.columns), who))
+
+
+@lru_cache(maxsize=32)
+def _detect_dimensions(cols: tuple[str, ...], who: Literal["referring", "physician"]):
     code_col = pick_column(
         cols,
         preferred_exact=("HCPCS_CD", "HCPCS_Cd", "hcpcs", "hcpcs_code", "hcpcs_cd"),
@@ -100,7 +125,11 @@ def detect_dimensions(df: pd.DataFrame, who: Literal["referring", "physician"]):
 
 
 def detect_measures(df: pd.DataFrame):
-    cols = df.columns
+    return dict(_detect_measures(tuple(df.columns)))
+
+
+@lru_cache(maxsize=32)
+def _detect_measures(cols: tuple[str, ...]):
 
     services_col = pick_column(
         cols,
@@ -189,34 +218,24 @@ def metric_priority_exists(df: pd.DataFrame) -> str | None:
 
 
 def per_row_totals(df: pd.DataFrame, meas: dict, services_series: pd.Series | None):
-    notes = {
-        "sub": pd.Series(pd.NA, index=df.index, dtype="object"),
-        "allow": pd.Series(pd.NA, index=df.index, dtype="object"),
-        "pay": pd.Series(pd.NA, index=df.index, dtype="object"),
-    }
-
-    if meas.get("tot_submitted") and meas["tot_submitted"] in df.columns:
-        row_tot_sub = to_num(df[meas["tot_submitted"]])
-    elif meas.get("avg_submitted") and services_series is not None:
-        row_tot_sub = to_num(df[meas["avg_submitted"]]) * to_num(services_series)
-        notes["sub"] = "derived_from_average"
-    else:
-        row_tot_sub = pd.Series(np.nan, index=df.index, dtype="float64")
-
-    if meas.get("tot_allowed") and meas["tot_allowed"] in df.columns:
-        row_tot_allow = to_num(df[meas["tot_allowed"]])
-    elif meas.get("avg_allowed") and services_series is not None:
-        row_tot_allow = to_num(df[meas["avg_allowed"]]) * to_num(services_series)
-        notes["allow"] = "derived_from_average"
-    else:
-        row_tot_allow = pd.Series(np.nan, index=df.index, dtype="float64")
-
-    if meas.get("tot_payment") and meas["tot_payment"] in df.columns:
-        row_tot_pay = to_num(df[meas["tot_payment"]])
-    elif meas.get("avg_payment") and services_series is not None:
-        row_tot_pay = to_num(df[meas["avg_payment"]]) * to_num(services_series)
-        notes["pay"] = "derived_from_average"
-    else:
-        row_tot_pay = pd.Series(np.nan, index=df.index, dtype="float64")
+    # Notes are scalars (pd.NA, or "derived_from_average" for derived totals); both broadcast
+    # when used as DataFrame columns, so no per-row note Series is allocated
+    notes = {"sub": pd.NA, "allow": pd.NA, "pay": pd.NA}
+    services = None  # numeric services, converted at most once and only if a total is derived
+
+    def _row_total(note_key: str, tot_key: str, avg_key: str) -> pd.Series:
+        nonlocal services
+        if meas.get(tot_key) and meas[tot_key] in df.columns:
+            return to_num(df[meas[tot_key]])
+        if meas.get(avg_key) and services_series is not None:
+            if services is None:
+                services = to_num(services_series)
+            notes[note_key] = "derived_from_average"
+            return to_num(df[meas[avg_key]]) * services
+        return pd.Series(np.nan, index=df.index, dtype="float64")
+
+    row_tot_sub = _row_total("sub", "tot_submitted", "avg_submitted")
+    row_tot_allow = _row_total("allow", "tot_allowed", "avg_allowed")
+    row_tot_pay = _row_total("pay", "tot_payment", "avg_payment")
 
     return row_tot_sub, row_tot_allow, row_tot_pay, notes
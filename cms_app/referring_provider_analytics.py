@@ -1,11 +1,26 @@
 """Analytics for referring provider data (refHCPCS.csv) - HCPCS A-codes."""
 from __future__ import annotations
 
+import csv
+import logging
+from functools import lru_cache
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import is_numeric_dtype, union_categoricals
 
-from .cms_query import get_paths, load_facility_affiliations, load_hospital_metadata, normalize_codes, normalize_states
+from .cms_query import (
+    _narrow_float,
+    _read_csv_prefetched,
+    _upper_labels,
+    get_paths,
+    load_facility_affiliations,
+    load_hospital_metadata,
+    normalize_codes,
+    normalize_states,
+)
 from .cms_columns import (
     detect_avg_payment_col,
     detect_hcpcs_col,
@@ -14,9 +29,26 @@ from .cms_columns import (
     detect_state_col,
     detect_total_payment_col,
 )
+from .frame_cache import read_frame_cache, write_frame_cache
+from .hospital_analytics_optimized import format_code_breakdown
 from .logger import logger
 
 
+# Result columns of hospitals_by_hcpcs_codes, and the frame returned when nothing matches
+_HOSPITAL_COLUMNS = [
+    "facility_id",
+    "hospital_name",
+    "hospital_city",
+    "hospital_state",
+    "total_procedures",
+    "total_payments",
+    "num_physicians",
+    "avg_procedures_per_physician",
+    "code_breakdown",
+]
+_EMPTY_HOSPITALS = pd.DataFrame(columns=_HOSPITAL_COLUMNS)
+
+
 def _detect_referring_columns(header: list[str]) -> dict[str, str | None]:
     """Detect columns in referring provider dataset (refHCPCS.csv)."""
     from .puf_utils import pick_column
@@ -51,6 +83,138 @@ def _detect_referring_columns(header: list[str]) -> dict[str, str | None]:
     }
 
 
+@lru_cache(maxsize=8)
+def _load_referring_meta(path: str, mtime_ns: int) -> tuple[dict[str, str | None], list[str]]:
+    """Detected referring PUF columns and the usecols to read, cached per file version."""
+    # Only the first line is needed, so skip pandas' parser setup ("utf-8-sig" drops a BOM like pandas does)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    cols = _detect_referring_columns(header)
+    usecols = [c for c in [cols["npi"], cols["hcpcs"], cols["state"], cols["services"], cols["total_payment"], cols["avg_payment"]] if c]
+    return cols, usecols
+
+
+@lru_cache(maxsize=2)
+def _facility_lookups() -> tuple[Dict[str, set[str]], Dict[str, Dict[str, Any]], pd.DataFrame]:
+    """NPI -> facility ids, facility id -> hospital info, and the flat NPI -> facility pairs.
+    
+    Built once per process from the (cached) affiliation and hospital metadata tables.
+    """
+    affiliations_df = load_facility_affiliations()
+    hospitals_df = load_hospital_metadata()
+    
+    # Strings normalized column-wise, then one zip pass; no iterrows
+    npi_to_facilities: Dict[str, set[str]] = {}
+    aff_npis = affiliations_df["npi"].astype(str).str.strip().tolist()
+    aff_facs = affiliations_df["facility_id"].astype(str).str.strip().tolist()
+    for npi, fac_id in zip(aff_npis, aff_facs):
+        if npi and fac_id:
+            npi_to_facilities.setdefault(npi, set()).add(fac_id)
+    
+    facility_to_hospital: Dict[str, Dict[str, Any]] = {}
+    hosp_fields = ["hospital_name", "hospital_city", "hospital_state"]
+    hosp_values = [
+        hospitals_df[col].astype(str).tolist() if col in hospitals_df.columns else [""] * len(hospitals_df)
+        for col in hosp_fields
+    ]
+    for fac_id, name, city, state in zip(
+        hospitals_df["facility_id"].astype(str).str.strip().tolist(), *hosp_values
+    ):
+        if fac_id:
+            facility_to_hospital[fac_id] = {
+                "hospital_name": name,
+                "hospital_city": city,
+                "hospital_state": state,
+            }
+    
+    # Flat NPI -> facility pairs, for expanding chunk rows with a merge
+    # (each NPI's facilities keep their npi_to_facilities iteration order)
+    npi_facility_pairs = pd.DataFrame(
+        [
+            (npi, fac_id)
+            for npi, facilities in npi_to_facilities.items()
+            for fac_id in facilities
+            if fac_id in facility_to_hospital
+        ],
+        columns=["npi", "facility_id"],
+    )
+    return npi_to_facilities, facility_to_hospital, npi_facility_pairs
+
+
+# Columns always present in the referring column table; payment columns are kept only when the PUF has them
+_REFERRING_COLUMNS = ["npi", "code", "state", "services"]
+
+
+@lru_cache(maxsize=2)
+def _load_referring_columns(path: str, mtime_ns: int) -> pd.DataFrame:
+    """Referring PUF rows reduced to npi, code, state, services and any payment columns.
+    
+    Cached per file version (path, mtime_ns), in process and as a pickle next to the CSV
+    that is rebuilt whenever the CSV is newer (failing to write it is not an error).
+    """
+    cache_file = Path(path).with_suffix(".columns.pkl")
+    table = read_frame_cache(cache_file, mtime_ns)
+    # Services and payments (everything after npi/code/state) must already be numeric
+    if (
+        table is not None
+        and list(table.columns[:len(_REFERRING_COLUMNS)]) == _REFERRING_COLUMNS
+        and all(is_numeric_dtype(table[col]) for col in table.columns[len(_REFERRING_COLUMNS) - 1:])
+    ):
+        return table
+    
+    table = _read_referring_columns(path, mtime_ns)
+    write_frame_cache(table, cache_file)
+    return table
+
+
+def _read_referring_columns(path: str, mtime_ns: int) -> pd.DataFrame:
+    """Read the npi/code/state/services/payment columns of the referring PUF.
+    
+    NPIs are stripped strings and codes/states stripped, uppercased strings, all kept as
+    categoricals; services and payments are converted to numbers once here, invalid or
+    missing values as 0, and float columns whose values fit float32 exactly are stored as
+    float32 (queries widen them back before summing).
+    """
+    cols, usecols = _load_referring_meta(path, mtime_ns)
+    rename_dict = {
+        cols["npi"]: "npi",
+        cols["hcpcs"]: "code",
+        cols["state"]: "state",
+        cols["services"]: "services",
+    }
+    if cols["total_payment"]:
+        rename_dict[cols["total_payment"]] = "total_payment"
+    if cols["avg_payment"]:
+        rename_dict[cols["avg_payment"]] = "avg_payment"
+    
+    # Code/state parse straight into categoricals (normalized per category instead of per
+    # row); NPIs stay text, as they are matched as strings
+    dtypes = {c: "category" for c in [cols["hcpcs"], cols["state"]] if c}
+    dtypes[cols["npi"]] = str
+    
+    parts: list[pd.DataFrame] = []
+    # The next chunk is parsed on a worker thread while this one is normalized
+    for chunk in _read_csv_prefetched(path, usecols=usecols, dtype=dtypes, low_memory=False, chunksize=500_000):
+        chunk = chunk.rename(columns=rename_dict)
+        chunk["npi"] = chunk["npi"].astype(str).str.strip().astype("category")
+        chunk["code"] = pd.Categorical(_upper_labels(chunk["code"]))
+        chunk["state"] = pd.Categorical(_upper_labels(chunk["state"]))
+        parts.append(chunk)
+    
+    columns = list(dict.fromkeys(rename_dict.values()))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    
+    category_columns = ["npi", "code", "state"]
+    table = pd.concat([p.drop(columns=category_columns) for p in parts], ignore_index=True)
+    for col in table.columns:
+        table[col] = _narrow_float(pd.to_numeric(table[col], errors="coerce").fillna(0))
+    # Plain concat would fall back to object dtype when chunk categories differ
+    for col in category_columns:
+        table[col] = union_categoricals([p[col].array for p in parts])
+    return table[[c for c in columns if c in table.columns]]
+
+
 def hospitals_by_hcpcs_codes(
     codes: List[str],
     states: Optional[List[str]] = None,
@@ -66,168 +230,86 @@ def hospitals_by_hcpcs_codes(
     states_n = normalize_states(states)
     
     if not codes_n:
-        return pd.DataFrame(
-            columns=[
-                "facility_id",
-                "hospital_name",
-                "hospital_city",
-                "hospital_state",
-                "total_procedures",
-                "total_payments",
-                "num_physicians",
-                "avg_procedures_per_physician",
-                "code_breakdown",
-            ]
-        )
+        return _EMPTY_HOSPITALS.copy()
     
     codes_set = set(codes_n)
     states_set = set(states_n) if states_n else None
     
-    # Load hospital data
+    # Load hospital data (lookup maps are built once per process)
     try:
-        affiliations_df = load_facility_affiliations()
-        hospitals_df = load_hospital_metadata()
+        npi_to_facilities, facility_to_hospital, npi_facility_pairs = _facility_lookups()
     except Exception as e:
         logger.error(f"Error loading hospital data: {e}", exc_info=True)
-        return pd.DataFrame(
-            columns=[
-                "facility_id",
-                "hospital_name",
-                "hospital_city",
-                "hospital_state",
-                "total_procedures",
-                "total_payments",
-                "num_physicians",
-                "avg_procedures_per_physician",
-                "code_breakdown",
-            ]
-        )
-    
-    # Build lookup maps
-    npi_to_facilities: Dict[str, set[str]] = {}
-    for _, row in affiliations_df.iterrows():
-        npi = str(row["npi"]).strip()
-        fac_id = str(row["facility_id"]).strip()
-        if npi and fac_id:
-            if npi not in npi_to_facilities:
-                npi_to_facilities[npi] = set()
-            npi_to_facilities[npi].add(fac_id)
-    
-    facility_to_hospital: Dict[str, Dict[str, Any]] = {}
-    for _, row in hospitals_df.iterrows():
-        fac_id = str(row["facility_id"]).strip()
-        if fac_id:
-            facility_to_hospital[fac_id] = {
-                "hospital_name": str(row.get("hospital_name", "")),
-                "hospital_city": str(row.get("hospital_city", "")),
-                "hospital_state": str(row.get("hospital_state", "")),
-            }
+        return _EMPTY_HOSPITALS.copy()
     
     # Read referring provider data
     path = get_paths().referring_puf
     if not path.exists():
         logger.warning(f"Referring provider file not found: {path}")
-        return pd.DataFrame(
-            columns=[
-                "facility_id",
-                "hospital_name",
-                "hospital_city",
-                "hospital_state",
-                "total_procedures",
-                "total_payments",
-                "num_physicians",
-                "avg_procedures_per_physician",
-                "code_breakdown",
-            ]
-        )
+        return _EMPTY_HOSPITALS.copy()
     
-    header = list(pd.read_csv(path, nrows=0, low_memory=False).columns)
-    cols = _detect_referring_columns(header)
+    # Referring rows come from the cached column table (the CSV is parsed once per file
+    # version); it is walked in the same 500k-row slices the CSV reader used, so the row
+    # cap below behaves as before
+    table = _load_referring_columns(str(path), path.stat().st_mtime_ns)
     
-    usecols = [c for c in [cols["npi"], cols["hcpcs"], cols["state"], cols["services"], cols["total_payment"], cols["avg_payment"]] if c]
+    # Early filter by codes and states (vectorized on the categorical columns)
+    keep = table["code"].isin(codes_set).to_numpy()
+    if states_set:
+        keep &= table["state"].isin(states_set).to_numpy()
+    # Affiliation membership is decided once per distinct NPI, then gathered by category codes
+    npi_has_facilities = table["npi"].cat.categories.isin(list(npi_to_facilities))
+    keep &= npi_has_facilities[table["npi"].cat.codes.to_numpy()]
+    # Slices past the last surviving row cannot contribute, so the walk stops there
+    matched = np.flatnonzero(keep)
+    scan_end = int(matched[-1]) + 1 if len(matched) else 0
     
     hospital_stats: Dict[str, Dict[str, Any]] = {}
     chunksize = 500_000
     processed_rows = 0
     
-    logger.info(f"Starting HCPCS hospital aggregation for codes: {codes_n}, states: {states_n}")
+    logger.info("Starting HCPCS hospital aggregation for codes: %s, states: %s", codes_n, states_n)
     
-    for chunk in pd.read_csv(path, usecols=usecols, low_memory=False, chunksize=chunksize):
-        # Rename columns
-        rename_dict = {
-            cols["npi"]: "npi",
-            cols["hcpcs"]: "code",
-            cols["state"]: "state",
-            cols["services"]: "services",
-        }
-        if cols["total_payment"]:
-            rename_dict[cols["total_payment"]] = "total_payment"
-        if cols["avg_payment"]:
-            rename_dict[cols["avg_payment"]] = "avg_payment"
-        
-        chunk = chunk.rename(columns=rename_dict)
-        
-        # Normalize
-        chunk["npi"] = chunk["npi"].astype(str).str.strip()
-        chunk["code"] = chunk["code"].astype(str).str.strip().str.upper()
-        chunk["state"] = chunk["state"].astype(str).str.strip().str.upper()
-        
-        # Filter
-        chunk = chunk[chunk["code"].isin(codes_set)]
-        if chunk.empty:
-            continue
-        
-        if states_set:
-            chunk = chunk[chunk["state"].isin(states_set)]
-        if chunk.empty:
-            continue
-        
-        # Convert numeric
-        chunk["services"] = pd.to_numeric(chunk["services"], errors="coerce").fillna(0)
-        
-        if "total_payment" in chunk.columns:
-            chunk["total_payment"] = pd.to_numeric(chunk["total_payment"], errors="coerce").fillna(0)
-        elif "avg_payment" in chunk.columns:
-            chunk["avg_payment"] = pd.to_numeric(chunk["avg_payment"], errors="coerce").fillna(0)
-            chunk["total_payment"] = chunk["avg_payment"] * chunk["services"]
-        else:
-            chunk["total_payment"] = 0.0
-        
-        # Filter NPIs with facilities
-        chunk["has_facilities"] = chunk["npi"].isin(npi_to_facilities.keys())
-        chunk = chunk[chunk["has_facilities"]].copy()
+    for start in range(0, scan_end, chunksize):
+        chunk = table.iloc[start:start + chunksize][keep[start:start + chunksize]]
         if chunk.empty:
             continue
+        chunk = chunk.assign(
+            npi=chunk["npi"].astype(object),
+            code=chunk["code"].astype(object),
+            # Narrow float32 columns are widened so sums accumulate at full precision
+            **{col: chunk[col].astype(np.float64) for col in chunk.columns if chunk[col].dtype == np.float32},
+        )
         
-        # Expand and aggregate (same logic as optimized version)
-        expanded_rows = []
-        npi_list = chunk["npi"].tolist()
-        code_list = chunk["code"].tolist()
-        services_list = chunk["services"].tolist()
-        payment_list = chunk["total_payment"].tolist()
-        
-        for i, npi in enumerate(npi_list):
-            facilities = npi_to_facilities.get(npi, set())
-            for fac_id in facilities:
-                if fac_id in facility_to_hospital:
-                    expanded_rows.append({
-                        "facility_id": fac_id,
-                        "npi": npi,
-                        "code": code_list[i],
-                        "services": services_list[i],
-                        "payment": payment_list[i],
-                    })
+        # Numeric columns are already converted in the table; only derived totals are computed
+        if "total_payment" not in chunk.columns:
+            if "avg_payment" in chunk.columns:
+                chunk["total_payment"] = chunk["avg_payment"] * chunk["services"]
+            else:
+                chunk["total_payment"] = 0.0
         
-        if not expanded_rows:
+        # Expand: one row per NPI-facility combination (hash join; chunk row order is kept)
+        expanded_df = (
+            chunk[["npi", "code", "services", "total_payment"]]
+            .merge(npi_facility_pairs, on="npi")
+            .rename(columns={"total_payment": "payment"})
+        )
+        if expanded_df.empty:
             continue
         
-        expanded_df = pd.DataFrame(expanded_rows)
-        facility_groups = expanded_df.groupby("facility_id", sort=False)
+        # Aggregate by facility and by (facility, code) in one pass each (first-seen order is kept)
+        by_fac = expanded_df.groupby("facility_id", sort=False).agg(
+            services=("services", "sum"),
+            payment=("payment", "sum"),
+        )
+        by_fac_code = expanded_df.groupby(["facility_id", "code"], sort=False)["services"].sum()
+        fac_npis = expanded_df.drop_duplicates(["facility_id", "npi"])
         
-        for fac_id, group in facility_groups:
-            if fac_id not in hospital_stats:
+        for fac_id, services, payment in zip(by_fac.index, by_fac["services"].tolist(), by_fac["payment"].tolist()):
+            stats = hospital_stats.get(fac_id)
+            if stats is None:
                 hosp_info = facility_to_hospital[fac_id]
-                hospital_stats[fac_id] = {
+                stats = hospital_stats[fac_id] = {
                     "facility_id": fac_id,
                     "hospital_name": hosp_info["hospital_name"],
                     "hospital_city": hosp_info["hospital_city"],
@@ -237,37 +319,28 @@ def hospitals_by_hcpcs_codes(
                     "physicians": set(),
                     "code_breakdown": {},
                 }
-            
-            hospital_stats[fac_id]["total_procedures"] += float(group["services"].sum())
-            hospital_stats[fac_id]["total_payments"] += float(group["payment"].sum())
-            hospital_stats[fac_id]["physicians"].update(group["npi"].unique())
-            
-            code_groups = group.groupby("code", sort=False)["services"].sum()
-            for code, services in code_groups.items():
-                hospital_stats[fac_id]["code_breakdown"][code] = (
-                    hospital_stats[fac_id]["code_breakdown"].get(code, 0.0) + float(services)
-                )
+            stats["total_procedures"] += services
+            stats["total_payments"] += payment
+        
+        for fac_id, npi in zip(fac_npis["facility_id"].tolist(), fac_npis["npi"].tolist()):
+            hospital_stats[fac_id]["physicians"].add(npi)
+        
+        for (fac_id, code), services in zip(by_fac_code.index, by_fac_code.tolist()):
+            breakdown = hospital_stats[fac_id]["code_breakdown"]
+            breakdown[code] = breakdown.get(code, 0.0) + services
         
         processed_rows += len(chunk)
+        # Release this slice's frames now rather than when the next slice rebinds the names,
+        # so two slices' intermediates are never alive at once
+        del chunk, expanded_df, by_fac, by_fac_code, fac_npis
         if processed_rows > 5_000_000:
             break
     
-    logger.info(f"Completed HCPCS processing. Found {len(hospital_stats)} hospitals from {processed_rows:,} rows")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Completed HCPCS processing. Found {len(hospital_stats)} hospitals from {processed_rows:,} rows")
     
     if not hospital_stats:
-        return pd.DataFrame(
-            columns=[
-                "facility_id",
-                "hospital_name",
-                "hospital_city",
-                "hospital_state",
-                "total_procedures",
-                "total_payments",
-                "num_physicians",
-                "avg_procedures_per_physician",
-                "code_breakdown",
-            ]
-        )
+        return _EMPTY_HOSPITALS.copy()
     
     # Convert to DataFrame
     rows = []
@@ -275,13 +348,6 @@ def hospitals_by_hcpcs_codes(
         num_physicians = len(stats["physicians"])
         avg_procedures = stats["total_procedures"] / num_physicians if num_physicians > 0 else 0.0
         
-        code_breakdown_parts = []
-        for code, services in sorted(stats["code_breakdown"].items(), key=lambda x: x[1], reverse=True)[:5]:
-            code_breakdown_parts.append(f"{code} ({int(services):,})")
-        code_breakdown = ", ".join(code_breakdown_parts)
-        if len(stats["code_breakdown"]) > 5:
-            code_breakdown += f" (+{len(stats['code_breakdown']) - 5} more)"
-        
         rows.append({
             "facility_id": fac_id,
             "hospital_name": stats["hospital_name"],
@@ -291,7 +357,7 @@ def hospitals_by_hcpcs_codes(
             "total_payments": stats["total_payments"],
             "num_physicians": num_physicians,
             "avg_procedures_per_physician": avg_procedures,
-            "code_breakdown": code_breakdown,
+            "code_breakdown": format_code_breakdown(stats["code_breakdown"]),
         })
     
     df = pd.DataFrame(rows)
@@ -1,26 +1,51 @@
 from __future__ import annotations
 
+import csv
 import io
 import re
+import zlib
+from functools import lru_cache
+from typing import Any
 from urllib.parse import urlencode
 
+import numpy as np
 import pandas as pd
-from flask import Blueprint, Response, current_app, jsonify, redirect, render_template, request, url_for
+from pandas.api.types import is_numeric_dtype
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    stream_template,
+    stream_with_context,
+    url_for,
+)
 
 from . import data_loading
-from .code_classification import CodeClassificationManager
-from .cms_query import DOCTORS_BY_CODE_UI_COLUMNS, doctors_by_codes
-from .filters import filter_doctors, filter_hospitals
+from .code_classification import get_classification_manager
+from .cms_query import DOCTORS_BY_CODE_UI_COLUMNS, doctors_by_codes, hospital_metadata_by_id
+from .filters import filter_doctors
 from .code_analytics import get_code_market_stats, get_top_codes_by_volume
 from .code_validation import validate_codes_before_search
 from .data_validation import check_data_files, get_data_health_summary
 from .hcpcs_lookup import get_hcpcs_lookup
-from .hospital_analytics import get_hospital_physicians, hospitals_by_codes
+from .hospital_analytics import get_hospital_code_stats, get_hospital_physicians, hospitals_by_codes
 from .logger import logger
 
 cms_bp = Blueprint("cms", __name__, template_folder="templates", static_folder="static")
 
 
+@cms_bp.record_once
+def _warm_shared_lookups(state) -> None:
+    """Load the HCPCS lookup and code classifications at app setup, not on the first request."""
+    get_hcpcs_lookup()
+    get_classification_manager()
+
+
 @cms_bp.route("/health", methods=["GET"])
 def health_check():
     """Data health check endpoint."""
@@ -37,21 +62,132 @@ def health_check():
     )
 
 
+# Separators for list inputs: "CA, OR", "CA OR", "CA;OR" or one value per line
+_LIST_SEP_RE = re.compile(r"[,;\s]+")
+# Accepted code format: ASCII letters (either case) and digits only
+_CODE_FORMAT_RE = re.compile(r"[A-Z0-9]+\Z", re.IGNORECASE | re.ASCII)
+# Explorer table headers (read-only; shared by every request)
+_HOSPITAL_COLUMN_LABELS = {
+    "facility_id": "Facility ID",
+    "hospital_name": "Hospital Name",
+    "hospital_city": "City",
+    "hospital_state": "State",
+    "total_procedures": "Total Procedures",
+    "total_payments": "Total Payments",
+    "num_physicians": "Number of Physicians",
+    "avg_procedures_per_physician": "Avg Procedures/Physician",
+    "code_breakdown": "Code Breakdown",
+}
+_DOCTOR_COLUMN_LABELS = dict(DOCTORS_BY_CODE_UI_COLUMNS)
+
+
 def _parse_csvish_list(value: str | None) -> list[str]:
     if not value:
         return []
-    # supports "CA, OR" or "CA OR" etc.
-    parts = [p.strip() for p in value.replace(";", ",").replace("\n", ",").split(",")]
-    out: list[str] = []
-    for p in parts:
-        if not p:
-            continue
-        # If user pasted space-separated states ("CA OR")
-        if " " in p:
-            out.extend([x.strip() for x in p.split() if x.strip()])
-        else:
-            out.append(p)
-    return [x for x in out if x]
+    if _LIST_SEP_RE.search(value) is None:
+        # Single token (e.g. one state): nothing to split or strip
+        return [value]
+    # Repeated entries (e.g. a code pasted twice) are dropped, keeping first-seen order
+    return list(dict.fromkeys(p for p in _LIST_SEP_RE.split(value) if p))
+
+
+def _coerce_min_services(raw: str | None) -> int | None:
+    """Parse the minimum services/procedures field; blank or non-integer input means no minimum."""
+    if raw is None:
+        return None
+    value = str(raw).strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _count_states(values: pd.Series) -> int:
+    """Count distinct non-null states case-insensitively (upper-cases only the unique values)."""
+    return len({str(v).upper() for v in values.unique() if pd.notna(v)})
+
+
+def _column_totals(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """Sum the given columns in one pass; only non-numeric columns are coerced (unparseable -> NaN, skipped)."""
+    block = df[columns]
+    if not all(is_numeric_dtype(dtype) for dtype in block.dtypes):
+        block = block.apply(pd.to_numeric, errors="coerce")
+    return block.sum()
+
+
+def _build_summary(
+    kind: str,
+    n_rows: int,
+    n_states: int,
+    codes: list[str],
+    totals: str,
+    min_services: int | None,
+    device_category: str | None,
+) -> str:
+    """Explorer result summary; kind is the singular row noun ("hospital" or "doctor")."""
+    parts = [
+        f"Top {min(250, n_rows):,} {kind}s by volume.",
+        f"Showing {n_rows:,} {kind}s across {n_states} states for codes: {', '.join(codes)}.",
+        totals,
+    ]
+    if min_services is not None:
+        parts.append(f"Minimum procedures per {kind}: {min_services:,}.")
+    if device_category:
+        parts.append(f"Category: {device_category}.")
+    return " ".join(parts)
+
+
+def _code_descriptions(codes: list[str]) -> dict[str, dict[str, str]]:
+    """Short/long HCPCS descriptions keyed by normalized code; unknown codes are left out."""
+    descriptions: dict[str, dict[str, str]] = {}
+    for code, code_info in get_hcpcs_lookup().get_codes(codes).items():
+        if code_info:
+            descriptions[code] = {
+                "short": code_info.short_description or (code_info.long_description[:50] if code_info.long_description else ""),
+                "long": code_info.long_description or "",
+            }
+    return descriptions
+
+
+def _table_preview(df: pd.DataFrame) -> pd.DataFrame:
+    """First MAX_TABLE_ROWS rows for display; frames already within the limit are used as-is."""
+    max_rows = current_app.config["MAX_TABLE_ROWS"]
+    return df if len(df) <= max_rows else df.head(max_rows)
+
+
+def _export_url(
+    dataset: str,
+    codes_raw: str,
+    states_raw: str,
+    min_services: int | None,
+    device_category: str | None,
+) -> str:
+    """Export link for an explorer search (the parsed minimum, so e.g. " 5 " is sent as "5").
+    
+    Empty fields are left out; export reads a missing field the same as an empty one.
+    """
+    params = (
+        ("dataset", dataset),
+        ("codes", codes_raw),
+        ("states", states_raw),
+        ("min_services", str(min_services) if min_services else ""),
+        ("device_category", device_category or ""),
+    )
+    return "/cms/export?" + urlencode([(key, value) for key, value in params if value])
+
+
+def _render_explorer(ctx: dict[str, Any], **overrides: Any) -> str | Response:
+    """Render the explorer page from its shared context plus per-branch overrides.
+    
+    Pages with a results table are streamed, so the page head and summary are sent while
+    the table rows are still being rendered.
+    """
+    ctx.update(overrides)
+    if ctx["rows"]:
+        return Response(stream_with_context(stream_template("cms_explorer.html", **ctx)))
+    return render_template("cms_explorer.html", **ctx)
 
 
 @cms_bp.route("/explorer", methods=["GET", "POST"])
@@ -78,7 +214,7 @@ def explorer():
     searched_codes: list[str] = []
 
     # Load device categories for dropdown
-    classification_manager = CodeClassificationManager()
+    classification_manager = get_classification_manager()
     device_categories = classification_manager.get_all_categories()
 
     # If device category is selected (via GET), load its codes
@@ -88,295 +224,148 @@ def explorer():
             codes_raw = ", ".join(category.codes)
             notice = f"Loaded {len(category.codes)} codes from category '{device_category}'. Click 'Run' to search."
 
+    # Template context shared by every render below; each return overrides what its branch computed
+    ctx: dict[str, Any] = {
+        "dataset": dataset,
+        "states": states_raw,
+        "codes": codes_raw,
+        "min_services": min_services_raw,
+        "procedure": procedure_raw,
+        "device_category": device_category,
+        "device_categories": device_categories,
+        "submitted": submitted,
+        "columns": [],
+        "column_labels": {},
+        "rows": [],
+        "summary": None,
+        "export_url": None,
+        "error": None,
+        "notice": None,
+        "is_doctors_by_code": dataset != "Hospitals",
+        "search_mode": search_mode,
+        "code_descriptions": {},
+        "searched_codes": [],
+    }
+
     if submitted:
         try:
-            logger.info(f"Search request: dataset={dataset}, codes={codes_raw[:100]}, states={states_raw}, min_services={min_services_raw}, device_category={device_category}")
+            logger.info(
+                "Search request: dataset=%s, codes=%.100s, states=%s, min_services=%s, device_category=%s",
+                dataset, codes_raw, states_raw, min_services_raw, device_category,
+            )
             
             states = _parse_csvish_list(states_raw)
             procedure_substrings = _parse_csvish_list(procedure_raw)
 
             codes = _parse_csvish_list(codes_raw)
-            min_services = None
-            if str(min_services_raw).strip():
-                try:
-                    min_services = int(str(min_services_raw).strip())
-                except Exception:
-                    min_services = None
+            min_services = _coerce_min_services(min_services_raw)
 
             if dataset == "Hospitals":
                 search_mode = "hospitals"
                 if not codes:
-                    columns = []
-                    rows = []
-                    summary = None
-                    export_url = None
                     notice = "Please enter at least one CPT or HCPCS code to search hospitals by procedure volume."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=columns,
-                        column_labels=column_labels,
-                        rows=rows,
-                        summary=summary,
-                        export_url=export_url,
-                        error=error,
-                        notice=notice,
-                        is_doctors_by_code=False,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, notice=notice, search_mode=search_mode)
                 
                 # Validate code format
-                invalid_codes = [c for c in codes if not re.match(r'^[A-Z0-9]+$', c.upper())]
+                invalid_codes = [c for c in codes if not _CODE_FORMAT_RE.match(c)]
                 if invalid_codes:
                     error = f"Invalid code format(s): {', '.join(invalid_codes)}. Codes should contain only letters and numbers."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=[],
-                        column_labels={},
-                        rows=[],
-                        summary=None,
-                        export_url=None,
-                        error=error,
-                        notice=None,
-                        is_doctors_by_code=False,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, error=error, search_mode=search_mode)
+                # Upper-cased only after the ASCII format check, so no non-ASCII letter can case-map into a code
+                codes = list(dict.fromkeys(c.upper() for c in codes))
                 
                 # Quick validation: check if codes exist in dataset
                 valid_codes, missing_codes = validate_codes_before_search(codes)
                 if missing_codes:
                     notice = f"Warning: The following codes were not found in the dataset: {', '.join(missing_codes)}. They may not exist in this year's data or may be very rare."
-                    logger.warning(f"Codes not found in dataset: {missing_codes}")
+                    logger.warning("Codes not found in dataset: %s", missing_codes)
                 
                 if not valid_codes:
                     error = f"None of the provided codes ({', '.join(codes)}) were found in the dataset. Please verify the codes are correct and exist in the current year's Medicare data."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=[],
-                        column_labels={},
-                        rows=[],
-                        summary=None,
-                        export_url=None,
-                        error=error,
-                        notice=None,
-                        is_doctors_by_code=False,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, error=error, search_mode=search_mode)
                 
                 # Use hospital analytics with only valid codes
                 filtered = hospitals_by_codes(codes=valid_codes, states=states, min_procedures=min_services, max_rows=250)
+                code_descriptions = _code_descriptions(valid_codes)
                 
                 # Summary
                 n_hospitals = len(filtered)
-                n_states = int(filtered["hospital_state"].dropna().astype(str).str.upper().nunique()) if n_hospitals else 0
-                total_procedures = int(pd.to_numeric(filtered["total_procedures"], errors="coerce").fillna(0).sum()) if n_hospitals else 0
-                total_payments = int(pd.to_numeric(filtered["total_payments"], errors="coerce").fillna(0).sum()) if n_hospitals else 0
+                # Hospital states come upper-cased from the hospital metadata
+                n_states = int(filtered["hospital_state"].nunique()) if n_hospitals else 0
+                totals = _column_totals(filtered, ["total_procedures", "total_payments"])
+                total_procedures = int(totals["total_procedures"])
+                total_payments = int(totals["total_payments"])
                 
-                summary = (
-                    f"Top {min(250, n_hospitals):,} hospitals by volume. Showing {n_hospitals:,} hospitals across {n_states} states for codes: {', '.join([c.upper() for c in codes])}. "
-                    f"Total procedures: {total_procedures:,}. Total payments: ${total_payments:,.0f}."
+                summary = _build_summary(
+                    "hospital", n_hospitals, n_states, codes,
+                    f"Total procedures: {total_procedures:,}. Total payments: ${total_payments:,.0f}.",
+                    min_services, device_category,
                 )
-                if min_services is not None:
-                    summary += f" Minimum procedures per hospital: {min_services:,}."
-                if device_category:
-                    summary += f" Category: {device_category}."
                 
-                preview = filtered.head(current_app.config["MAX_TABLE_ROWS"])
-                column_labels = {
-                    "facility_id": "Facility ID",
-                    "hospital_name": "Hospital Name",
-                    "hospital_city": "City",
-                    "hospital_state": "State",
-                    "total_procedures": "Total Procedures",
-                    "total_payments": "Total Payments",
-                    "num_physicians": "Number of Physicians",
-                    "avg_procedures_per_physician": "Avg Procedures/Physician",
-                    "code_breakdown": "Code Breakdown",
-                }
+                preview = _table_preview(filtered)
+                column_labels = _HOSPITAL_COLUMN_LABELS
                 
-                q = {
-                    "dataset": dataset,
-                    "codes": codes_raw,
-                    "states": states_raw,
-                    "min_services": str(min_services or ""),
-                    "device_category": device_category or "",
-                }
-                export_url = "/cms/export?" + urlencode(q)
+                export_url = _export_url(dataset, codes_raw, states_raw, min_services, device_category)
                 
-                columns = list(preview.columns)
-                rows = preview.to_dict(orient="records")
-                
-                # Enrich with HCPCS code descriptions
-                hcpcs_lookup = get_hcpcs_lookup()
-                for code in codes:
-                    code_info = hcpcs_lookup.get_code(code)
-                    if code_info:
-                        code_descriptions[code.upper()] = {
-                            "short": code_info.short_description or (code_info.long_description[:50] if code_info.long_description else ""),
-                            "long": code_info.long_description or "",
-                        }
+                columns = preview.columns.tolist()
+                # Rows as namedtuples in column order (no per-row dicts); the template indexes
+                # them by column position and reads fields such as facility_id by name
+                rows = list(preview.itertuples(index=False, name="Row"))
+
                 searched_codes = codes
             else:  # DoctorsByCode
                 search_mode = "doctors"
                 if not codes:
-                    columns = []
-                    rows = []
-                    summary = None
-                    export_url = None
                     notice = "Please enter at least one CPT or HCPCS code, or select a device category."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=columns,
-                        column_labels=column_labels,
-                        rows=rows,
-                        summary=summary,
-                        export_url=export_url,
-                        error=error,
-                        notice=notice,
-                        is_doctors_by_code=True,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, notice=notice, search_mode=search_mode)
 
                 # Validate code format
-                invalid_codes = [c for c in codes if not re.match(r'^[A-Z0-9]+$', c.upper())]
+                invalid_codes = [c for c in codes if not _CODE_FORMAT_RE.match(c)]
                 if invalid_codes:
                     error = f"Invalid code format(s): {', '.join(invalid_codes)}. Codes should contain only letters and numbers."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=[],
-                        column_labels={},
-                        rows=[],
-                        summary=None,
-                        export_url=None,
-                        error=error,
-                        notice=None,
-                        is_doctors_by_code=True,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, error=error, search_mode=search_mode)
+                # Upper-cased only after the ASCII format check, so no non-ASCII letter can case-map into a code
+                codes = list(dict.fromkeys(c.upper() for c in codes))
 
                 # Quick validation: check if codes exist in dataset
                 valid_codes, missing_codes = validate_codes_before_search(codes)
                 if missing_codes:
                     notice = f"Warning: The following codes were not found in the dataset: {', '.join(missing_codes)}. They may not exist in this year's data or may be very rare."
-                    logger.warning(f"Codes not found in dataset: {missing_codes}")
+                    logger.warning("Codes not found in dataset: %s", missing_codes)
                 
                 if not valid_codes:
                     error = f"None of the provided codes ({', '.join(codes)}) were found in the dataset. Please verify the codes are correct and exist in the current year's Medicare data."
-                    return render_template(
-                        "cms_explorer.html",
-                        dataset=dataset,
-                        states=states_raw,
-                        codes=codes_raw,
-                        min_services=min_services_raw,
-                        procedure=procedure_raw,
-                        device_category=device_category,
-                        device_categories=device_categories,
-                        submitted=submitted,
-                        columns=[],
-                        column_labels={},
-                        rows=[],
-                        summary=None,
-                        export_url=None,
-                        error=error,
-                        notice=None,
-                        is_doctors_by_code=True,
-                        search_mode=search_mode,
-                    )
+                    return _render_explorer(ctx, error=error, search_mode=search_mode)
 
                 df = doctors_by_codes(codes=valid_codes, states=states, min_services=min_services, max_rows=250)
+                code_descriptions = _code_descriptions(valid_codes)
                 filtered = df
 
                 # Summary
                 n_docs = len(filtered)
-                n_states = int(filtered["state"].dropna().astype(str).str.upper().nunique()) if n_docs else 0
-                total_services = int(pd.to_numeric(filtered["total_services_selected_codes"], errors="coerce").fillna(0).sum()) if n_docs else 0
-                summary = (
-                    f"Top {min(250, n_docs):,} doctors by volume. Showing {n_docs:,} doctors across {n_states} states for codes: {', '.join([c.upper() for c in codes])}. "
-                    f"Total services for these codes: {total_services:,}."
+                n_states = _count_states(filtered["state"]) if n_docs else 0
+                total_services = int(_column_totals(filtered, ["total_services_selected_codes"]).iloc[0]) if n_docs else 0
+                summary = _build_summary(
+                    "doctor", n_docs, n_states, codes,
+                    f"Total services for these codes: {total_services:,}.",
+                    min_services, device_category,
                 )
-                if min_services is not None:
-                    summary += f" Minimum procedures per doctor: {min_services:,}."
-                if device_category:
-                    summary += f" Category: {device_category}."
-
-                preview = filtered.head(current_app.config["MAX_TABLE_ROWS"])
-                column_labels = {k: v for k, v in DOCTORS_BY_CODE_UI_COLUMNS}
-
-                q = {
-                    "dataset": dataset,
-                    "codes": codes_raw,
-                    "states": states_raw,
-                    "min_services": str(min_services or ""),
-                    "device_category": device_category or "",
-                }
-                export_url = "/cms/export?" + urlencode(q)
-
-            columns = list(preview.columns)
-            rows = preview.to_dict(orient="records")
-            
-            # Enrich with HCPCS code descriptions
-            hcpcs_lookup = get_hcpcs_lookup()
-            for code in codes:
-                code_info = hcpcs_lookup.get_code(code)
-                if code_info:
-                    code_descriptions[code.upper()] = {
-                        "short": code_info.short_description or code_info.long_description[:50],
-                        "long": code_info.long_description,
-                    }
-            searched_codes = codes
+
+                preview = _table_preview(filtered)
+                column_labels = _DOCTOR_COLUMN_LABELS
+
+                export_url = _export_url(dataset, codes_raw, states_raw, min_services, device_category)
+
+                columns = preview.columns.tolist()
+                rows = list(preview.itertuples(index=False, name="Row"))
+
+                searched_codes = codes
         except Exception as e:
-            logger.error(f"Error in explorer: {str(e)}", exc_info=True)
+            logger.error("Error in explorer: %s", e, exc_info=True)
             error = str(e)
 
-    return render_template(
-        "cms_explorer.html",
-        dataset=dataset,
-        states=states_raw,
-        codes=codes_raw,
-        min_services=min_services_raw,
-        procedure=procedure_raw,
-        device_category=device_category,
-        device_categories=device_categories,
-        submitted=submitted,
+    return _render_explorer(
+        ctx,
         columns=columns,
         column_labels=column_labels,
         rows=rows,
@@ -384,7 +373,6 @@ def explorer():
         export_url=export_url,
         error=error,
         notice=notice,
-        is_doctors_by_code=(dataset != "Hospitals"),
         search_mode=search_mode,
         code_descriptions=code_descriptions,
         searched_codes=searched_codes,
@@ -402,7 +390,7 @@ def export():
 
     # If device category is selected, load its codes
     if device_category and not codes_raw:
-        classification_manager = CodeClassificationManager()
+        classification_manager = get_classification_manager()
         category = classification_manager.get_category(device_category)
         if category:
             codes_raw = ", ".join(category.codes)
@@ -410,22 +398,38 @@ def export():
     states = _parse_csvish_list(states_raw)
     procedure_substrings = _parse_csvish_list(procedure_raw)
     codes = _parse_csvish_list(codes_raw)
-    min_services = None
-    if str(min_services_raw).strip():
-        try:
-            min_services = int(str(min_services_raw).strip())
-        except Exception:
-            min_services = None
+    min_services = _coerce_min_services(min_services_raw)
 
     def _stream_csv(df):
-        # Stream CSV in chunks to avoid large in-memory buffers
-        header = True
-        for start in range(0, len(df), 5_000):
-            chunk = df.iloc[start : start + 5_000]
-            buf = io.StringIO()
-            chunk.to_csv(buf, index=False, header=header)
-            header = False
-            yield buf.getvalue()
+        # Stream CSV in chunks to avoid large in-memory buffers; one buffer is reused for
+        # every chunk. Rows go through csv.writer as plain lists (missing values blanked the
+        # way to_csv writes them) instead of pandas' CSV formatter per chunk. Chunks are cut
+        # from each column's backing array, so no per-chunk DataFrame is built
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(df.columns.tolist())
+        arrays = [df.iloc[:, i].array for i in range(df.shape[1])]
+        for start in range(0, len(df), 50_000):
+            # Convert per slice so only one chunk's object copy is alive at a time
+            cells = []
+            for arr in arrays:
+                part = arr[start : start + 50_000]
+                values = np.array(part, dtype=object)
+                values[pd.isna(part)] = ""
+                cells.append(values.tolist())
+            writer.writerows(zip(*cells))
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+
+    def _gzip_chunks(chunks):
+        # Compress the stream incrementally (gzip container), one compressor for all chunks
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
 
     if dataset == "Hospitals":
         if codes:
@@ -433,20 +437,60 @@ def export():
             filename = "hospitals_by_code.csv"
         else:
             files = data_loading.discover_hospital_files(current_app.config["HOSPITALS_DIR"])
-            df = data_loading.get_hospitals_df(files)
-            filtered = filter_hospitals(df, states=states)
+            filtered = data_loading.get_hospitals_filtered(files, states=states)
             filename = "hospitals_filtered.csv"
     else:  # DoctorsByCode
         filtered = doctors_by_codes(codes=codes, states=states, min_services=min_services, max_rows=250)
         filename = "doctors_by_code.csv"
 
+    # Byte chunks are handed to the server as-is (direct_passthrough); gzip them when the
+    # client accepts it, since the repetitive CSV text compresses well
+    body = _stream_csv(filtered)
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if request.accept_encodings["gzip"]:
+        body = _gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
     return Response(
-        _stream_csv(filtered),
+        body,
         mimetype="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        headers=headers,
+        direct_passthrough=True,
     )
 
 
+def _cacheable(resp: Response, max_age: int) -> Response:
+    """Let browsers/proxies cache a deterministic response, revalidating via a content-hash ETag."""
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
+# Popular codes for medical device companies (common device-related codes), shown on the
+# code lookup page when no query is given
+_POPULAR_CODES = (
+    "L8679", "A4593", "62270", "62272", "61889", "77080",
+    "27215", "27216", "27217", "27218", "27236", "27244",
+    "27447", "27486", "27487", "27130", "27132",
+    "22840", "22842", "22843", "22844", "22845",
+    "C1776", "C1778", "C1821", "C1822",
+)
+
+
+@lru_cache(maxsize=1)
+def _popular_code_payload() -> tuple[dict[str, str], ...]:
+    """Resolved popular codes for the code lookup page (built once; shared, do not mutate)."""
+    hcpcs_lookup = get_hcpcs_lookup()
+    payload = []
+    for code_obj in hcpcs_lookup.get_codes(_POPULAR_CODES).values():
+        if code_obj:
+            payload.append({
+                "code": code_obj.code,
+                "description": code_obj.short_description or code_obj.long_description[:80],
+            })
+    return tuple(payload)
+
+
 @cms_bp.route("/code-lookup", methods=["GET"])
 def code_lookup():
     """HCPCS code lookup and search interface."""
@@ -461,30 +505,18 @@ def code_lookup():
         code_objects = hcpcs_lookup.search_codes(query, limit=50)
         codes = [code.to_dict() for code in code_objects]
     else:
-        # Show popular codes for medical device companies
-        # These are common device-related codes
-        popular_code_list = [
-            "L8679", "A4593", "62270", "62272", "61889", "77080",
-            "27215", "27216", "27217", "27218", "27236", "27244",
-            "27447", "27486", "27487", "27130", "27132",
-            "22840", "22842", "22843", "22844", "22845",
-            "C1776", "C1778", "C1821", "C1822",
-        ]
-        
-        for code_str in popular_code_list:
-            code_obj = hcpcs_lookup.get_code(code_str)
-            if code_obj:
-                popular_codes.append({
-                    "code": code_obj.code,
-                    "description": code_obj.short_description or code_obj.long_description[:80],
-                })
+        popular_codes = _popular_code_payload()
     
-    return render_template(
+    html = render_template(
         "code_lookup.html",
         query=query,
         codes=codes,
         popular_codes=popular_codes,
     )
+    if query:
+        return html
+    # The query-less page only lists the static popular codes
+    return _cacheable(make_response(html), max_age=3600)
 
 
 # Code analytics route removed - too slow. Use inline insights in explorer instead.
@@ -497,18 +529,16 @@ def hospital_detail(facility_id: str):
     codes = _parse_csvish_list(codes_raw) if codes_raw else None
     
     # Get hospital info
-    from .cms_query import load_hospital_metadata
-    hospitals = load_hospital_metadata()
-    hospital_row = hospitals[hospitals["facility_id"] == facility_id]
+    hospital_meta = hospital_metadata_by_id().get(facility_id)
     
-    if hospital_row.empty:
+    if hospital_meta is None:
         return render_template(
             "error.html",
             error="Hospital not found",
             message=f"Hospital with Facility ID {facility_id} not found in database.",
         ), 404
     
-    hospital = hospital_row.iloc[0].to_dict()
+    hospital = dict(hospital_meta)
     
     # Get physicians at this hospital for the codes
     physicians = []
@@ -517,10 +547,8 @@ def hospital_detail(facility_id: str):
         physicians = physicians_df.to_dict(orient="records")
         
         # Add hospital stats if available
-        hospitals_df = hospitals_by_codes(codes=codes, max_rows=10000)
-        hosp_stats = hospitals_df[hospitals_df["facility_id"] == facility_id]
-        if not hosp_stats.empty:
-            stats = hosp_stats.iloc[0]
+        stats = get_hospital_code_stats(facility_id, codes, max_rows=10000)
+        if stats is not None:
             hospital["total_procedures"] = stats.get("total_procedures", 0)
             hospital["total_payments"] = stats.get("total_payments", 0)
             hospital["num_physicians"] = stats.get("num_physicians", 0)
@@ -544,13 +572,13 @@ def code_autocomplete():
     hcpcs_lookup = get_hcpcs_lookup()
     results = hcpcs_lookup.autocomplete(prefix, limit=20)
     
-    return {"results": results}
+    return _cacheable(jsonify({"results": results}), max_age=600)
 
 
 @cms_bp.route("/code-classification", methods=["GET", "POST"])
 def code_classification():
     """Manage device categories and code classifications."""
-    manager = CodeClassificationManager()
+    manager = get_classification_manager()
     error: str | None = None
     success: str | None = None
 
@@ -566,7 +594,7 @@ def code_classification():
                 else:
                     manager.add_category(name, description)
                     success = f"Category '{name}' created successfully."
-                    logger.info(f"Created device category: {name}")
+                    logger.info("Created device category: %s", name)
             
             elif action == "update":
                 name = request.form.get("name", "").strip()
@@ -576,13 +604,13 @@ def code_classification():
                 else:
                     manager.update_category(name, description)
                     success = f"Category '{name}' updated successfully."
-                    logger.info(f"Updated device category: {name}")
+                    logger.info("Updated device category: %s", name)
             
             elif action == "delete":
                 name = request.form.get("name", "").strip()
                 if manager.delete_category(name):
                     success = f"Category '{name}' deleted successfully."
-                    logger.info(f"Deleted device category: {name}")
+                    logger.info("Deleted device category: %s", name)
                 else:
                     error = f"Category '{name}' not found."
             
@@ -593,7 +621,7 @@ def code_classification():
                     error = "Category name and code are required."
                 elif manager.add_code_to_category(category_name, code):
                     success = f"Code '{code}' added to category '{category_name}'."
-                    logger.info(f"Added code {code} to category {category_name}")
+                    logger.info("Added code %s to category %s", code, category_name)
                 else:
                     error = f"Code '{code}' already in category '{category_name}' or category not found."
             
@@ -604,16 +632,16 @@ def code_classification():
                     error = "Category name and code are required."
                 elif manager.remove_code_from_category(category_name, code):
                     success = f"Code '{code}' removed from category '{category_name}'."
-                    logger.info(f"Removed code {code} from category {category_name}")
+                    logger.info("Removed code %s from category %s", code, category_name)
                 else:
                     error = f"Code '{code}' not found in category '{category_name}' or category not found."
         
         except ValueError as e:
             error = str(e)
-            logger.error(f"Error in code classification: {error}")
+            logger.error("Error in code classification: %s", error)
         except Exception as e:
             error = f"Unexpected error: {str(e)}"
-            logger.error(f"Unexpected error in code classification: {str(e)}", exc_info=True)
+            logger.error("Unexpected error in code classification: %s", e, exc_info=True)
 
     categories = manager.get_all_categories()
     
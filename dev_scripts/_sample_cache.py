@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pickle
+from pathlib import Path
+from typing import Callable, Hashable
+
+import pandas as pd
+
+_CACHE_DIR = Path(__file__).resolve().parent
+
+
+def cached_frame(
+    name: str,
+    sources: list[Path],
+    args: Hashable,
+    build: Callable[[], pd.DataFrame],
+) -> pd.DataFrame:
+    """Return build(), reusing a pickle next to this script while the sources and args are unchanged.
+
+    The cache is keyed by each source file's path and mtime plus the query args, so editing
+    a CSV or the script's filters rebuilds it; failing to write it is not an error.
+    """
+    cache_file = _CACHE_DIR / f".{name}.pkl"
+    key = (tuple((str(p), p.stat().st_mtime_ns) for p in sources), args)
+    try:
+        with open(cache_file, "rb") as f:
+            cached_key, df = pickle.load(f)
+        if cached_key == key:
+            return df
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    df = build()
+    try:
+        with open(cache_file, "wb") as f:
+            pickle.dump((key, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return df
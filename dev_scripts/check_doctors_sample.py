@@ -5,6 +5,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from _sample_cache import cached_frame
 from cms_app.data_loading import discover_doctors_files, query_doctors
 from cms_app.filters import filter_doctors
 
@@ -14,7 +15,15 @@ def main() -> None:
     doctors_dir = root / "Doctors_08_2025"
 
     files = discover_doctors_files(doctors_dir)
-    df = query_doctors(files, states=["OR", "WA"], procedure_substrings=["bone", "spine"])
+    states = ["OR", "WA"]
+    procedure_substrings = ["bone", "spine"]
+    # Re-runs reuse the query result until the CSVs or the filters change
+    df = cached_frame(
+        "check_doctors_sample",
+        [files.utilization, files.national],
+        (tuple(states), tuple(procedure_substrings)),
+        lambda: query_doctors(files, states=states, procedure_substrings=procedure_substrings),
+    )
     filtered = filter_doctors(df)
     print(filtered.head(10).to_string(index=False))
 
@@ -5,6 +5,7 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from _sample_cache import cached_frame
 from cms_app.data_loading import discover_hospital_files, get_hospitals_df
 from cms_app.filters import filter_hospitals
 
@@ -16,7 +17,8 @@ def main() -> None:
         hospitals_dir = root / "Hospitals_08_2025"
 
     files = discover_hospital_files(hospitals_dir)
-    df = get_hospitals_df(files)
+    # Re-runs reuse the loaded frame until the CSV changes
+    df = cached_frame("check_hospitals_sample", [files.general_info], (), lambda: get_hospitals_df(files))
 
     filtered = filter_hospitals(df, states=["OR", "WA"])
     print(filtered.head(10).to_string(index=False))
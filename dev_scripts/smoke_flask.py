@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -8,42 +9,71 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 from cms_app import create_app
 
 
+def check_get_explorer(c) -> str:
+    r = c.get("/cms/explorer")
+    assert r.status_code == 200
+    return "GET /cms/explorer OK"
+
+
+def check_post_hospitals(c) -> str:
+    r = c.post(
+        "/cms/explorer",
+        data={"dataset": "Hospitals", "states": "OR,WA", "procedure": ""},
+    )
+    assert r.status_code == 200
+    return "POST Hospitals OK"
+
+
+def check_get_hospitals_export(c) -> str:
+    r = c.get("/cms/export?dataset=Hospitals&states=OR,WA", buffered=False)
+    assert r.status_code == 200
+    assert (r.headers.get("Content-Type", "") or "").startswith("text/csv")
+    _ = next(r.response)  # read a small chunk
+    r.close()
+    return "GET Hospitals export OK"
+
+
+def check_post_doctors(c) -> str:
+    # Doctors path (can be slower due to large national file)
+    r = c.post(
+        "/cms/explorer",
+        data={"dataset": "Doctors", "states": "OR,WA", "procedure": "spine"},
+    )
+    assert r.status_code == 200
+    return "POST Doctors OK"
+
+
+def check_get_doctors_export(c) -> str:
+    r = c.get("/cms/export?dataset=Doctors&states=OR,WA&procedure=spine", buffered=False)
+    assert r.status_code == 200
+    assert (r.headers.get("Content-Type", "") or "").startswith("text/csv")
+    _ = next(r.response)  # read a small chunk
+    r.close()
+    return "GET Doctors export OK"
+
+
+CHECKS = [
+    check_get_explorer,
+    check_post_hospitals,
+    check_get_hospitals_export,
+    check_post_doctors,
+    check_get_doctors_export,
+]
+
+
 def main() -> None:
     app = create_app()
 
-    with app.test_client() as c:
-        r = c.get("/cms/explorer")
-        assert r.status_code == 200
-        print("GET /cms/explorer OK")
-
-        r = c.post(
-            "/cms/explorer",
-            data={"dataset": "Hospitals", "states": "OR,WA", "procedure": ""},
-        )
-        assert r.status_code == 200
-        print("POST Hospitals OK")
-
-        r = c.get("/cms/export?dataset=Hospitals&states=OR,WA", buffered=False)
-        assert r.status_code == 200
-        assert (r.headers.get("Content-Type", "") or "").startswith("text/csv")
-        _ = next(r.response)  # read a small chunk
-        r.close()
-        print("GET Hospitals export OK")
-
-        # Doctors path (can be slower due to large national file)
-        r = c.post(
-            "/cms/explorer",
-            data={"dataset": "Doctors", "states": "OR,WA", "procedure": "spine"},
-        )
-        assert r.status_code == 200
-        print("POST Doctors OK")
-
-        r = c.get("/cms/export?dataset=Doctors&states=OR,WA&procedure=spine", buffered=False)
-        assert r.status_code == 200
-        assert (r.headers.get("Content-Type", "") or "").startswith("text/csv")
-        _ = next(r.response)  # read a small chunk
-        r.close()
-        print("GET Doctors export OK")
+    def run(check):
+        # The checks are independent; each worker gets its own client (clients aren't thread-safe)
+        with app.test_client() as c:
+            return check(c)
+
+    # Wall time is roughly the slowest check (the Doctors ones) instead of the sum
+    with ThreadPoolExecutor(max_workers=len(CHECKS)) as ex:
+        futures = [ex.submit(run, check) for check in CHECKS]
+        for future in futures:
+            print(future.result())
 
     print("Smoke test OK")
 